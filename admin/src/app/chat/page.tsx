@@ -18,6 +18,9 @@ export default function ChatPage() {
   const [selectedImage, setSelectedImage] = useState<File | null>(null);
   const [imagePreview, setImagePreview] = useState<string | null>(null);
   const [uploading, setUploading] = useState(false);
+  // Cursor for the page before the oldest loaded message; null once the history is exhausted
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const wsRef = useRef<WebSocket | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
@@ -50,7 +53,12 @@ export default function ChatPage() {
     wsRef.current = ws;
 
     ws.onmessage = (event) => {
-      const msg: MessageType = JSON.parse(event.data);
+      const data = JSON.parse(event.data);
+      if (data.type === "ping") {
+        ws.send(JSON.stringify({ type: "pong" }));
+        return;
+      }
+      const msg: MessageType = data;
       setChatMessages((prev) => {
         if (prev.some((m) => m.id === msg.id)) return prev;
         return [...prev, msg];
@@ -64,13 +72,36 @@ export default function ChatPage() {
 
   useEffect(() => {
     if (selectedUser) {
-      messages.getMessages(selectedUser).then(setChatMessages).catch(console.error);
+      messages
+        .getMessages(selectedUser)
+        .then((page) => {
+          setChatMessages(page.items);
+          setOlderCursor(page.nextCursor);
+        })
+        .catch(console.error);
+      messages.markRead(selectedUser).catch(console.error);
     }
   }, [selectedUser]);
 
+  // Follows new messages only; older pages are prepended without jumping to the bottom
+  const lastMessageId = chatMessages[chatMessages.length - 1]?.id;
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
-  }, [chatMessages]);
+  }, [lastMessageId]);
+
+  const loadOlderMessages = async () => {
+    if (!selectedUser || !olderCursor) return;
+    setLoadingOlder(true);
+    try {
+      const page = await messages.getMessages(selectedUser, olderCursor);
+      setChatMessages((prev) => [...page.items.filter((m) => !prev.some((p) => p.id === m.id)), ...prev]);
+      setOlderCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
 
   const handleImageSelect = (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
@@ -184,6 +215,17 @@ export default function ChatPage() {
                 <h3 className="font-semibold">{getContactName(selectedUser)}</h3>
               </div>
               <div className="flex-1 overflow-y-auto p-4 space-y-3">
+                {olderCursor && (
+                  <div className="flex justify-center">
+                    <button
+                      onClick={loadOlderMessages}
+                      className="text-xs text-green-600 hover:text-green-700 disabled:opacity-50"
+                      disabled={loadingOlder}
+                    >
+                      {loadingOlder ? <Loader2 size={14} className="animate-spin" /> : "Daha eski mesajlar"}
+                    </button>
+                  </div>
+                )}
                 {chatMessages.map((msg) => (
                   <div
                     key={msg.id}
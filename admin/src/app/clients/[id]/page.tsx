@@ -8,7 +8,7 @@ import {
   dietPlans as dietPlansApi,
   weightLogs,
   Client,
-  DietPlan,
+  DietPlanSummary,
   DietPlanCreate,
   WeightLog,
   Appointment,
@@ -35,7 +35,7 @@ export default function ClientProfilePage() {
   const clientId = params.id as string;
 
   const [client, setClient] = useState<Client | null>(null);
-  const [plans, setPlans] = useState<DietPlan[]>([]);
+  const [plans, setPlans] = useState<DietPlanSummary[]>([]);
   const [logs, setLogs] = useState<WeightLog[]>([]);
   const [appts, setAppts] = useState<Appointment[]>([]);
   const [loading, setLoading] = useState(true);
@@ -241,7 +241,7 @@ export default function ClientProfilePage() {
                     <span>{plan.end_date}</span>
                   </div>
                   <p className="text-xs text-gray-400 mt-1">
-                    {plan.meals.length} ogun tanimli
+                    {plan.meal_count} ogun tanimli
                   </p>
                 </div>
               </Link>
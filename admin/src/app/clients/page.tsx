@@ -44,6 +44,8 @@ export default function ClientsPage() {
         full_name: newClient.full_name,
         role: "client",
         phone: newClient.phone || undefined,
+        // Until the app reports the device's zone, assume the client lives where the dietitian does
+        timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
       }) as { id: string };
       await users.addClient(created.id);
       setShowAdd(false);
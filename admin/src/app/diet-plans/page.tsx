@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { dietPlans, users, DietPlan, Client } from "@/lib/api";
+import { dietPlans, users, DietPlanSummary, Client } from "@/lib/api";
 import { Plus, Edit2, Trash2, UtensilsCrossed, CalendarDays } from "lucide-react";
 import Link from "next/link";
 import { Button } from "@/components/ui/Button";
@@ -13,7 +13,7 @@ import { EmptyState } from "@/components/ui/EmptyState";
 import { PageHeader } from "@/components/ui/PageHeader";
 
 export default function DietPlansPage() {
-  const [plans, setPlans] = useState<DietPlan[]>([]);
+  const [plans, setPlans] = useState<DietPlanSummary[]>([]);
   const [clients, setClients] = useState<Client[]>([]);
   const [loading, setLoading] = useState(true);
   const [showCreate, setShowCreate] = useState(false);
@@ -128,7 +128,7 @@ export default function DietPlansPage() {
 
                 <div className="flex items-center gap-1.5 text-sm text-gray-500 mb-5">
                   <UtensilsCrossed size={14} className="text-violet-400" />
-                  <span>{plan.meals.length} ogun tanimli</span>
+                  <span>{plan.meal_count} ogun tanimli</span>
                 </div>
 
                 <div className="flex gap-2">
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { users, dietPlans, appointments, Client, DietPlan, Appointment } from "@/lib/api";
+import { users, dietPlans, appointments, Client, DietPlanSummary, Appointment } from "@/lib/api";
 import { Users, UtensilsCrossed, Calendar, Activity, ArrowRight, Clock } from "lucide-react";
 import { StatCard } from "@/components/ui/StatCard";
 import { Card } from "@/components/ui/Card";
@@ -12,7 +12,7 @@ import Link from "next/link";
 
 export default function DashboardPage() {
   const [clients, setClients] = useState<Client[]>([]);
-  const [plans, setPlans] = useState<DietPlan[]>([]);
+  const [plans, setPlans] = useState<DietPlanSummary[]>([]);
   const [appts, setAppts] = useState<Appointment[]>([]);
   const [loading, setLoading] = useState(true);
   const { user } = useAuth();
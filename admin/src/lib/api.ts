@@ -1,9 +1,6 @@
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api";
 
-async function request<T>(
-  endpoint: string,
-  options: RequestInit = {}
-): Promise<T> {
+async function send(endpoint: string, options: RequestInit = {}): Promise<Response> {
   const token =
     typeof window !== "undefined" ? localStorage.getItem("access_token") : null;
 
@@ -40,7 +37,7 @@ async function request<T>(
             headers,
           });
           if (!retryRes.ok) throw new Error("Request failed after refresh");
-          return retryRes.json();
+          return retryRes;
         }
       } catch {
         localStorage.removeItem("access_token");
@@ -58,10 +55,29 @@ async function request<T>(
     throw new Error(error.detail || "Request failed");
   }
 
+  return res;
+}
+
+async function request<T>(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<T> {
+  const res = await send(endpoint, options);
   if (res.status === 204) return {} as T;
   return res.json();
 }
 
+// Paged endpoints return the cursor for the next page in the X-Next-Cursor header
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+async function requestPage<T>(endpoint: string): Promise<Page<T>> {
+  const res = await send(endpoint);
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 export const api = {
   get: <T>(endpoint: string) => request<T>(endpoint),
   post: <T>(endpoint: string, data?: unknown) =>
@@ -84,6 +100,7 @@ export const auth = {
     full_name: string;
     role: string;
     phone?: string;
+    timezone?: string;
   }) => api.post("/auth/register", data),
 };
 
@@ -95,14 +112,14 @@ export const users = {
   removeClient: (clientId: string) => api.delete(`/users/clients/${clientId}`),
   getClient: (clientId: string) => api.get<Client>(`/users/clients/${clientId}`),
   getClientDietPlans: (clientId: string) =>
-    api.get<DietPlan[]>(`/users/clients/${clientId}/diet-plans`),
+    api.get<DietPlanSummary[]>(`/users/clients/${clientId}/diet-plans?view=summary`),
   getClientAppointments: (clientId: string) =>
     api.get<Appointment[]>(`/users/clients/${clientId}/appointments`),
 };
 
 // Diet Plans
 export const dietPlans = {
-  list: () => api.get<DietPlan[]>("/diet-plans"),
+  list: () => api.get<DietPlanSummary[]>("/diet-plans?view=summary"),
   get: (id: string) => api.get<DietPlan>(`/diet-plans/${id}`),
   create: (data: DietPlanCreate) => api.post<DietPlan>("/diet-plans", data),
   update: (id: string, data: Partial<DietPlanCreate>) =>
@@ -137,9 +154,16 @@ export const weightLogs = {
 };
 
 // Messages
+const MESSAGE_PAGE_SIZE = 50;
+
 export const messages = {
   conversations: () => api.get<Conversation[]>("/messages/conversations"),
-  getMessages: (userId: string) => api.get<Message[]>(`/messages/${userId}`),
+  // Latest page, or the page before `before`, oldest first
+  getMessages: (userId: string, before?: string) =>
+    requestPage<Message>(
+      `/messages/${userId}?limit=${MESSAGE_PAGE_SIZE}${before ? `&before=${encodeURIComponent(before)}` : ""}`
+    ),
+  markRead: (userId: string) => api.post(`/messages/${userId}/read`),
   send: (data: { receiver_id: string; content?: string; image_url?: string }) =>
     api.post<Message>("/messages", data),
   uploadImage: async (file: File): Promise<{ image_url: string }> => {
@@ -191,6 +215,7 @@ export interface User {
   full_name: string;
   role: string;
   phone: string | null;
+  timezone: string;
   created_at: string;
 }
 
@@ -211,6 +236,11 @@ export interface DietPlan {
   meals: Meal[];
 }
 
+export interface DietPlanSummary extends Omit<DietPlan, "meals"> {
+  meal_count: number;
+  total_calories: number;
+}
+
 export interface MealItem {
   id: string;
   meal_id: string;
@@ -0,0 +1,64 @@
+"""add_scheduled_notification_targets
+
+Revision ID: 15e599f5c375
+Revises: 49ed4fbc6b21
+Create Date: 2026-10-18 21:02:47.118364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '15e599f5c375'
+down_revision: Union[str, None] = '49ed4fbc6b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scheduled_notifications', sa.Column('dietitian_id', sa.UUID(), nullable=True))
+    op.add_column('scheduled_notifications', sa.Column('target_client_ids', postgresql.ARRAY(sa.UUID()), nullable=True))
+    op.create_foreign_key(
+        'scheduled_notifications_dietitian_id_fkey',
+        'scheduled_notifications', 'users',
+        ['dietitian_id'], ['id'],
+        ondelete='CASCADE',
+    )
+
+    # Audience queries look up a dietitian's client links and plans per client
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_dietitian_clients_dietitian_id_client_id',
+            'dietitian_clients',
+            ['dietitian_id', 'client_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_diet_plans_dietitian_id_client_id',
+            'diet_plans',
+            ['dietitian_id', 'client_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_diet_plans_dietitian_id_client_id',
+            table_name='diet_plans',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_dietitian_clients_dietitian_id_client_id',
+            table_name='dietitian_clients',
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint('scheduled_notifications_dietitian_id_fkey', 'scheduled_notifications', type_='foreignkey')
+    op.drop_column('scheduled_notifications', 'target_client_ids')
+    op.drop_column('scheduled_notifications', 'dietitian_id')
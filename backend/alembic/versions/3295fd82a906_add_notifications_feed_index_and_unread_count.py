@@ -0,0 +1,50 @@
+"""add_notifications_feed_index_and_unread_count
+
+Revision ID: 3295fd82a906
+Revises: 610291b39cad
+Create Date: 2026-10-18 19:14:06.381572
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3295fd82a906'
+down_revision: Union[str, None] = '610291b39cad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('unread_notification_count', sa.Integer(), server_default='0', nullable=False))
+    op.alter_column('users', 'unread_notification_count', server_default=None)
+    op.execute("""
+        UPDATE users u SET unread_notification_count = n.unread
+        FROM (
+            SELECT user_id, count(*) AS unread FROM notifications WHERE NOT is_read GROUP BY user_id
+        ) n
+        WHERE n.user_id = u.id
+    """)
+
+    # Built concurrently so sends keep writing while the index is created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_notifications_user_id_created_at',
+            'notifications',
+            ['user_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_notifications_user_id_created_at',
+            table_name='notifications',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('users', 'unread_notification_count')
@@ -0,0 +1,67 @@
+"""add_conversations_table
+
+Revision ID: 3a0a3c6fda42
+Revises: 8e8cee911724
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a0a3c6fda42'
+down_revision: Union[str, None] = '8e8cee911724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_a_id', sa.UUID(), nullable=False),
+    sa.Column('user_b_id', sa.UUID(), nullable=False),
+    sa.Column('last_message_id', sa.UUID(), nullable=True),
+    sa.Column('last_message_preview', sa.String(length=255), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('unread_count_a', sa.Integer(), nullable=False),
+    sa.Column('unread_count_b', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_a_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_b_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_a_id', 'user_b_id', name='uq_conversations_pair')
+    )
+    op.create_index('ix_conversations_user_a_last_message', 'conversations', ['user_a_id', 'last_message_at'], unique=False)
+    op.create_index('ix_conversations_user_b_last_message', 'conversations', ['user_b_id', 'last_message_at'], unique=False)
+
+    # Backfill one row per existing pair from the latest message and the current unread flags
+    op.execute("""
+        INSERT INTO conversations (
+            id, user_a_id, user_b_id, last_message_id, last_message_preview,
+            last_message_at, unread_count_a, unread_count_b
+        )
+        SELECT
+            gen_random_uuid(), t.user_a_id, t.user_b_id, t.id,
+            left(coalesce(nullif(t.content, ''), '[Fotoğraf]'), 255), t.created_at,
+            (SELECT count(*) FROM messages m
+             WHERE m.receiver_id = t.user_a_id AND m.sender_id = t.user_b_id AND NOT m.is_read),
+            (SELECT count(*) FROM messages m
+             WHERE m.receiver_id = t.user_b_id AND m.sender_id = t.user_a_id AND NOT m.is_read)
+        FROM (
+            SELECT DISTINCT ON (least(sender_id, receiver_id), greatest(sender_id, receiver_id))
+                least(sender_id, receiver_id) AS user_a_id,
+                greatest(sender_id, receiver_id) AS user_b_id,
+                id, content, created_at
+            FROM messages
+            ORDER BY least(sender_id, receiver_id), greatest(sender_id, receiver_id), created_at DESC
+        ) t
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversations_user_b_last_message', table_name='conversations')
+    op.drop_index('ix_conversations_user_a_last_message', table_name='conversations')
+    op.drop_table('conversations')
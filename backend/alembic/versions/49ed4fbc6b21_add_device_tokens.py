@@ -0,0 +1,55 @@
+"""add_device_tokens
+
+Revision ID: 49ed4fbc6b21
+Revises: 3295fd82a906
+Create Date: 2026-10-18 19:52:40.118936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '49ed4fbc6b21'
+down_revision: Union[str, None] = '3295fd82a906'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('device_tokens',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('token', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    op.create_index(op.f('ix_device_tokens_user_id'), 'device_tokens', ['user_id'], unique=False)
+
+    # Carry over each user's single token; a token shared by several users stays with the newest one
+    op.execute("""
+        INSERT INTO device_tokens (id, user_id, token, created_at, last_seen_at)
+        SELECT DISTINCT ON (apns_token) gen_random_uuid(), id, apns_token, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+        FROM users
+        WHERE apns_token IS NOT NULL AND apns_token <> ''
+        ORDER BY apns_token, created_at DESC
+    """)
+    op.drop_column('users', 'apns_token')
+
+
+def downgrade() -> None:
+    op.add_column('users', sa.Column('apns_token', sa.VARCHAR(length=255), autoincrement=False, nullable=True))
+    op.execute("""
+        UPDATE users u SET apns_token = d.token
+        FROM (
+            SELECT DISTINCT ON (user_id) user_id, token FROM device_tokens ORDER BY user_id, last_seen_at DESC
+        ) d
+        WHERE d.user_id = u.id
+    """)
+    op.drop_index(op.f('ix_device_tokens_user_id'), table_name='device_tokens')
+    op.drop_table('device_tokens')
@@ -0,0 +1,39 @@
+"""add_refresh_token_families
+
+Revision ID: 4ea6e7b02d11
+Revises: e8ccd93c2c96
+Create Date: 2026-10-18 22:36:51.207745
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4ea6e7b02d11'
+down_revision: Union[str, None] = 'e8ccd93c2c96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('refresh_token_families',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('current_jti', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_refresh_token_families_user_id'), 'refresh_token_families', ['user_id'], unique=False)
+    op.create_index('ix_refresh_token_families_revoked_at', 'refresh_token_families', ['revoked_at'], unique=False, postgresql_where=sa.text('revoked_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_token_families_revoked_at', table_name='refresh_token_families', postgresql_where=sa.text('revoked_at IS NOT NULL'))
+    op.drop_index(op.f('ix_refresh_token_families_user_id'), table_name='refresh_token_families')
+    op.drop_table('refresh_token_families')
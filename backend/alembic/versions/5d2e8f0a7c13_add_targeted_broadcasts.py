@@ -0,0 +1,58 @@
+"""add_targeted_broadcasts
+
+Revision ID: 5d2e8f0a7c13
+Revises: c3f9a1d27b64
+Create Date: 2026-10-18 23:58:41.126094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8f0a7c13'
+down_revision: Union[str, None] = 'c3f9a1d27b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('broadcasts', sa.Column('targeted', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('broadcasts', 'targeted', server_default=None)
+    op.alter_column('broadcast_receipts', 'read_at', existing_type=sa.DateTime(), nullable=True)
+
+    # Built concurrently so sends and reads keep writing while the indexes are created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_broadcasts_untargeted_created_at',
+            'broadcasts',
+            ['created_at'],
+            unique=False,
+            postgresql_where=sa.text('NOT targeted'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_broadcast_receipts_user_id',
+            'broadcast_receipts',
+            ['user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_broadcast_receipts_user_id', table_name='broadcast_receipts', postgresql_concurrently=True)
+        op.drop_index(
+            'ix_broadcasts_untargeted_created_at',
+            table_name='broadcasts',
+            postgresql_where=sa.text('NOT targeted'),
+            postgresql_concurrently=True,
+        )
+    # Targeted broadcasts have no meaning without the column; unread receipts never existed before it
+    op.execute("DELETE FROM broadcasts WHERE targeted")
+    op.execute("DELETE FROM broadcast_receipts WHERE read_at IS NULL")
+    op.alter_column('broadcast_receipts', 'read_at', existing_type=sa.DateTime(), nullable=False)
+    op.drop_column('broadcasts', 'targeted')
@@ -0,0 +1,45 @@
+"""add_broadcasts
+
+Revision ID: 610291b39cad
+Revises: de8241b36bce
+Create Date: 2026-10-18 18:32:57.240816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '610291b39cad'
+down_revision: Union[str, None] = 'de8241b36bce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('broadcasts',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_broadcasts_created_at'), 'broadcasts', ['created_at'], unique=False)
+    op.create_table('broadcast_receipts',
+    sa.Column('broadcast_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('read_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['broadcast_id'], ['broadcasts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('broadcast_id', 'user_id')
+    )
+    op.add_column('users', sa.Column('broadcasts_read_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'broadcasts_read_at')
+    op.drop_table('broadcast_receipts')
+    op.drop_index(op.f('ix_broadcasts_created_at'), table_name='broadcasts')
+    op.drop_table('broadcasts')
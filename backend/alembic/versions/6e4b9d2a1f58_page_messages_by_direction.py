@@ -0,0 +1,52 @@
+"""page_messages_by_direction
+
+Revision ID: 6e4b9d2a1f58
+Revises: 8a1f3c6e2b47
+Create Date: 2026-10-19 01:12:44.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e4b9d2a1f58'
+down_revision: Union[str, None] = '8a1f3c6e2b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Chat pages walk each direction by (created_at, id); with id in the index the
+    # cursor comparison and its tie-break are both served by the index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_sender_receiver_created_at_id',
+            'messages',
+            ['sender_id', 'receiver_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_messages_sender_receiver_created_at',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_sender_receiver_created_at',
+            'messages',
+            ['sender_id', 'receiver_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_messages_sender_receiver_created_at_id',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
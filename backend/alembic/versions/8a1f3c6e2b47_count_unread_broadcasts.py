@@ -0,0 +1,48 @@
+"""count_unread_broadcasts
+
+Revision ID: 8a1f3c6e2b47
+Revises: 5d2e8f0a7c13
+Create Date: 2026-10-19 00:21:09.538170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a1f3c6e2b47'
+down_revision: Union[str, None] = '5d2e8f0a7c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # unread_notification_count now covers broadcasts too: add each client's unread ones
+    op.execute("""
+        UPDATE users u SET unread_notification_count = u.unread_notification_count + b.unread
+        FROM (
+            SELECT u.id AS user_id, count(*) AS unread
+            FROM users u
+            JOIN broadcasts b ON b.created_at >= u.created_at
+                AND (u.broadcasts_read_at IS NULL OR b.created_at > u.broadcasts_read_at)
+            LEFT JOIN broadcast_receipts r ON r.broadcast_id = b.id AND r.user_id = u.id
+            WHERE u.role = 'client'
+                AND r.read_at IS NULL
+                AND (NOT b.targeted OR r.user_id IS NOT NULL)
+            GROUP BY u.id
+        ) b
+        WHERE b.user_id = u.id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE users u SET unread_notification_count = coalesce(n.unread, 0)
+        FROM users x
+        LEFT JOIN (
+            SELECT user_id, count(*) AS unread FROM notifications WHERE NOT is_read GROUP BY user_id
+        ) n ON n.user_id = x.id
+        WHERE x.id = u.id
+    """)
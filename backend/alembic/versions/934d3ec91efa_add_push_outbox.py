@@ -0,0 +1,70 @@
+"""add_push_outbox
+
+Revision ID: 934d3ec91efa
+Revises: a530f8f54cfe
+Create Date: 2026-10-18 17:05:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '934d3ec91efa'
+down_revision: Union[str, None] = 'a530f8f54cfe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('push_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('notifications', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('push_outbox',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('job_id', sa.UUID(), nullable=True),
+    sa.Column('notification_id', sa.UUID(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('apns_token', sa.String(length=255), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['push_jobs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_push_outbox_job_id', 'push_outbox', ['job_id'], unique=False)
+    op.create_index('ix_push_outbox_pending_next_attempt', 'push_outbox', ['next_attempt_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+    op.create_table('push_attempts',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('outbox_id', sa.UUID(), nullable=False),
+    sa.Column('attempt', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['outbox_id'], ['push_outbox.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_push_attempts_outbox_id'), 'push_attempts', ['outbox_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_push_attempts_outbox_id'), table_name='push_attempts')
+    op.drop_table('push_attempts')
+    op.drop_index('ix_push_outbox_pending_next_attempt', table_name='push_outbox', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_index('ix_push_outbox_job_id', table_name='push_outbox')
+    op.drop_table('push_outbox')
+    op.drop_table('push_jobs')
@@ -0,0 +1,44 @@
+"""add_messages_full_text_search
+
+Revision ID: a530f8f54cfe
+Revises: f57189852545
+Create Date: 2026-10-18 16:21:48.730215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a530f8f54cfe'
+down_revision: Union[str, None] = 'f57189852545'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Adding a stored generated column rewrites the messages table once
+    op.add_column('messages', sa.Column(
+        'content_tsv',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('turkish'::regconfig, coalesce(content, ''))", persisted=True),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_content_tsv',
+            'messages',
+            ['content_tsv'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_content_tsv', table_name='messages', postgresql_concurrently=True)
+    op.drop_column('messages', 'content_tsv')
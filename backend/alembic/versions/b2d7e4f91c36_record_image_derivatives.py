@@ -0,0 +1,88 @@
+"""record_image_derivatives
+
+Revision ID: b2d7e4f91c36
+Revises: 6e4b9d2a1f58
+Create Date: 2026-10-19 02:04:31.885102
+
+"""
+import os
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d7e4f91c36'
+down_revision: Union[str, None] = '6e4b9d2a1f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copies of app.utils.uploads at the time of this revision
+MESSAGE_UPLOADS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'uploads', 'messages'
+)
+MESSAGE_UPLOADS_URL = '/uploads/messages/'
+DERIVATIVE_NAME = re.compile(r'^([0-9a-f]{64})\.(jpg|jpeg|png|gif|webp)$', re.IGNORECASE)
+DERIVATIVE_KINDS = ('thumb', 'preview')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'image_uploads',
+        sa.Column('image_url', sa.String(length=500), nullable=False),
+        sa.Column('derivatives_ready', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('image_url'),
+    )
+    op.add_column('messages', sa.Column('derivatives_ready', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('messages', 'derivatives_ready', server_default=None)
+
+    # Existing uploads: whatever derivatives are on disk now is the recorded state from here on
+    bind = op.get_bind()
+    urls = bind.execute(sa.text(
+        "SELECT DISTINCT image_url FROM messages WHERE image_url LIKE :prefix"
+    ), {'prefix': MESSAGE_UPLOADS_URL + '%'}).scalars().all()
+    rows = []
+    for image_url in urls:
+        match = DERIVATIVE_NAME.match(image_url[len(MESSAGE_UPLOADS_URL):])
+        if not match:
+            continue
+        ready = all(
+            os.path.exists(os.path.join(MESSAGE_UPLOADS_DIR, f'{match.group(1)}_{kind}.webp'))
+            for kind in DERIVATIVE_KINDS
+        )
+        rows.append({'image_url': image_url, 'derivatives_ready': ready})
+    if rows:
+        bind.execute(sa.text(
+            "INSERT INTO image_uploads (image_url, derivatives_ready, created_at) "
+            "VALUES (:image_url, :derivatives_ready, now() AT TIME ZONE 'utc')"
+        ), rows)
+        bind.execute(sa.text(
+            "UPDATE messages m SET derivatives_ready = true FROM image_uploads u "
+            "WHERE u.image_url = m.image_url AND u.derivatives_ready"
+        ))
+
+    # Built concurrently so chats keep writing while the index is created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_image_url',
+            'messages',
+            ['image_url'],
+            unique=False,
+            postgresql_where=sa.text('image_url IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_image_url',
+            table_name='messages',
+            postgresql_where=sa.text('image_url IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+    op.drop_column('messages', 'derivatives_ready')
+    op.drop_table('image_uploads')
@@ -0,0 +1,59 @@
+"""add_diet_plan_listing_indexes
+
+Revision ID: b7c41e5d9a20
+Revises: 4ea6e7b02d11
+Create Date: 2026-10-18 23:14:05.392817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c41e5d9a20'
+down_revision: Union[str, None] = '4ea6e7b02d11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Plan lists page newest first per owner; meals and items are fetched by parent id
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_diet_plans_dietitian_id_created_at',
+            'diet_plans',
+            ['dietitian_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_diet_plans_client_id_created_at',
+            'diet_plans',
+            ['client_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_meals_diet_plan_id'),
+            'meals',
+            ['diet_plan_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_meal_items_meal_id'),
+            'meal_items',
+            ['meal_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_meal_items_meal_id'), table_name='meal_items', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_meals_diet_plan_id'), table_name='meals', postgresql_concurrently=True)
+        op.drop_index('ix_diet_plans_client_id_created_at', table_name='diet_plans', postgresql_concurrently=True)
+        op.drop_index('ix_diet_plans_dietitian_id_created_at', table_name='diet_plans', postgresql_concurrently=True)
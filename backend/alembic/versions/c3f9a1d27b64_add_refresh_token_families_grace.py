@@ -0,0 +1,28 @@
+"""add_refresh_token_families_grace
+
+Revision ID: c3f9a1d27b64
+Revises: b7c41e5d9a20
+Create Date: 2026-10-18 23:52:17.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a1d27b64'
+down_revision: Union[str, None] = 'b7c41e5d9a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_token_families', sa.Column('previous_jti', sa.UUID(), nullable=True))
+    op.add_column('refresh_token_families', sa.Column('rotated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('refresh_token_families', 'rotated_at')
+    op.drop_column('refresh_token_families', 'previous_jti')
@@ -0,0 +1,71 @@
+"""add_scheduled_notifications_next_run_at
+
+Revision ID: de8241b36bce
+Revises: 934d3ec91efa
+Create Date: 2026-10-18 17:48:30.917254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de8241b36bce'
+down_revision: Union[str, None] = '934d3ec91efa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scheduled_notifications', sa.Column('next_run_at', sa.DateTime(), nullable=True))
+
+    # One-time rows run at their timestamp; daily rows run today unless already sent today, else tomorrow.
+    # Timestamps without an offset have always been treated as UTC. scheduled_time is free text, so it is
+    # parsed by helpers that accept only the ISO and HH:MM shapes the scheduler reads (Postgres alone
+    # would also take words like 'tomorrow') and return NULL instead of aborting on a bad value.
+    op.execute("SET LOCAL TIME ZONE 'UTC'")
+    op.execute(r"""
+        CREATE FUNCTION pg_temp.parse_once(value text) RETURNS timestamp AS $$
+        BEGIN
+            IF value !~ '^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}(:?\d{2})?)?$' THEN
+                RETURN NULL;
+            END IF;
+            RETURN value::timestamptz AT TIME ZONE 'UTC';
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(r"""
+        CREATE FUNCTION pg_temp.parse_daily(value text) RETURNS time AS $$
+        BEGIN
+            IF value !~ '^\d{1,2}:\d{2}$' THEN
+                RETURN NULL;
+            END IF;
+            RETURN value::time;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        UPDATE scheduled_notifications SET next_run_at = CASE
+            WHEN schedule_type = 'once' THEN pg_temp.parse_once(scheduled_time)
+            ELSE date_trunc('day', now() AT TIME ZONE 'UTC') + pg_temp.parse_daily(scheduled_time)
+                + CASE WHEN last_sent_at >= date_trunc('day', now() AT TIME ZONE 'UTC')
+                       THEN interval '1 day' ELSE interval '0' END
+        END
+        WHERE is_active
+    """)
+    # Rows that could not be parsed would never run; deactivate them rather than leave them due forever
+    op.execute("UPDATE scheduled_notifications SET is_active = false WHERE is_active AND next_run_at IS NULL")
+    op.execute("DROP FUNCTION pg_temp.parse_once(text)")
+    op.execute("DROP FUNCTION pg_temp.parse_daily(text)")
+    op.create_index('ix_scheduled_notifications_next_run_at', 'scheduled_notifications', ['next_run_at'], unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_notifications_next_run_at', table_name='scheduled_notifications', postgresql_where=sa.text('is_active'))
+    op.drop_column('scheduled_notifications', 'next_run_at')
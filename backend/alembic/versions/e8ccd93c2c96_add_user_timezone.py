@@ -0,0 +1,28 @@
+"""add_user_timezone
+
+Revision ID: e8ccd93c2c96
+Revises: 15e599f5c375
+Create Date: 2026-10-18 21:47:13.560218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8ccd93c2c96'
+down_revision: Union[str, None] = '15e599f5c375'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing users keep receiving daily notifications on UTC until they set a timezone
+    op.add_column('users', sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+    op.alter_column('users', 'timezone', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'timezone')
@@ -0,0 +1,39 @@
+"""add_messages_conversation_index
+
+Revision ID: f4a4466bc77d
+Revises: 3a0a3c6fda42
+Create Date: 2026-10-18 11:03:27.221864
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a4466bc77d'
+down_revision: Union[str, None] = '3a0a3c6fda42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so existing chats keep writing while the index is created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_sender_receiver_created_at',
+            'messages',
+            ['sender_id', 'receiver_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_sender_receiver_created_at',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
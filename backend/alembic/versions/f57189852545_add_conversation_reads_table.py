@@ -0,0 +1,59 @@
+"""add_conversation_reads_table
+
+Revision ID: f57189852545
+Revises: f4a4466bc77d
+Create Date: 2026-10-18 14:36:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f57189852545'
+down_revision: Union[str, None] = 'f4a4466bc77d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversation_reads',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('peer_id', sa.UUID(), nullable=False),
+    sa.Column('last_read_message_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['peer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'peer_id')
+    )
+
+    # Seed watermarks from the newest message each user has already read
+    op.execute("""
+        INSERT INTO conversation_reads (user_id, peer_id, last_read_message_at)
+        SELECT receiver_id, sender_id, max(created_at)
+        FROM messages
+        WHERE is_read
+        GROUP BY receiver_id, sender_id
+    """)
+
+    # Re-derive unread counters from the watermarks so both agree from the start
+    op.execute("""
+        UPDATE conversations c SET
+            unread_count_a = (
+                SELECT count(*) FROM messages m
+                LEFT JOIN conversation_reads r ON r.user_id = c.user_a_id AND r.peer_id = c.user_b_id
+                WHERE m.sender_id = c.user_b_id AND m.receiver_id = c.user_a_id
+                  AND (r.last_read_message_at IS NULL OR m.created_at > r.last_read_message_at)
+            ),
+            unread_count_b = (
+                SELECT count(*) FROM messages m
+                LEFT JOIN conversation_reads r ON r.user_id = c.user_b_id AND r.peer_id = c.user_a_id
+                WHERE m.sender_id = c.user_a_id AND m.receiver_id = c.user_b_id
+                  AND (r.last_read_message_at IS NULL OR m.created_at > r.last_read_message_at)
+            )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('conversation_reads')
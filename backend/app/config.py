@@ -7,6 +7,66 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # For this long after a refresh, the refresh token it replaced returns the current pair instead of
+    # counting as reuse, so concurrent refreshes from one device don't end the session
+    REFRESH_REUSE_GRACE_SECONDS: float = 30
+    # How often each API worker picks up sessions revoked by other workers
+    REVOCATION_SYNC_SECONDS: float = 5
+    # JWT library used to verify tokens: "jose" or "pyjwt" (needs PyJWT installed)
+    JWT_BACKEND: str = "jose"
+    # Verified access tokens kept per worker, each until it expires; 0 disables the cache
+    TOKEN_CACHE_SIZE: int = 10000
+    # "memory" for a single worker, "postgres" to fan chat out across workers via LISTEN/NOTIFY
+    CHAT_BROKER: str = "memory"
+    # Threads used by the chat WebSocket handler for message persistence. Kept small: each
+    # extra busy thread takes GIL time from the event loop that delivers the echoes.
+    CHAT_DB_THREADS: int = 2
+    # Per-socket outbound queue; when full, "close" disconnects the slow socket and "drop" skips the message
+    WS_SEND_QUEUE_SIZE: int = 100
+    WS_OVERFLOW_POLICY: str = "close"
+    # Sockets are pinged every interval and evicted after the timeout without any frame from the client
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25
+    WS_HEARTBEAT_TIMEOUT_SECONDS: float = 60
+    # How /uploads is served: "direct", or "x-accel-redirect"/"x-sendfile" to let the front proxy send the bytes.
+    # UPLOADS_ACCEL_PREFIX is the internal nginx location that maps to the uploads directory.
+    UPLOADS_SERVE_MODE: str = "direct"
+    UPLOADS_ACCEL_PREFIX: str = "/internal-uploads/"
+    # Worker processes and WebP quality for chat image thumbnails/previews
+    IMAGE_DERIVATIVE_WORKERS: int = 2
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    # Concurrent APNs requests per push worker, multiplexed over one HTTP/2 connection
+    APNS_SENDER_THREADS: int = 8
+    # Push worker: rows claimed per batch, how long a claim is held, idle poll interval and retry backoff
+    PUSH_BATCH_SIZE: int = 100
+    PUSH_LEASE_SECONDS: int = 300
+    PUSH_POLL_INTERVAL_SECONDS: float = 1
+    PUSH_MAX_ATTEMPTS: int = 5
+    PUSH_RETRY_BASE_SECONDS: float = 30
+    # Longest the notification scheduler sleeps before re-checking for due schedules
+    SCHEDULER_MAX_SLEEP_SECONDS: float = 300
+    # False keeps the scheduler out of the API workers; run `python -m app.services.scheduler` instead
+    SCHEDULER_IN_API: bool = True
+    # Retention run by the scheduler leader every RETENTION_INTERVAL_HOURS (0 turns a limit off):
+    # read notifications older than N days, personal notifications beyond the newest N per user,
+    # broadcasts older than N days, finished push deliveries older than N days, and device tokens
+    # not re-registered for N days
+    RETENTION_INTERVAL_HOURS: float = 6
+    RETENTION_BATCH_SIZE: int = 1000
+    NOTIFICATION_READ_RETENTION_DAYS: int = 90
+    NOTIFICATION_MAX_PER_USER: int = 1000
+    BROADCAST_RETENTION_DAYS: int = 90
+    PUSH_RETENTION_DAYS: int = 7
+    DEVICE_TOKEN_RETENTION_DAYS: int = 180
+
+    # bcrypt cost for new hashes; existing hashes with another cost are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+    # Processes per API worker that hash and check passwords, and how many requests may be
+    # hashing or waiting for a process before login/register answer 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Per-worker cache of authenticated users (id, role, name); 0 disables it
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
 
     class Config:
         env_file = ".env"
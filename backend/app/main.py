@@ -1,11 +1,21 @@
 import os
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
+from app.config import settings
+from app.middleware.auth import require_dietitian
 from app.routers import auth, users, diet_plans, weight_logs, messages, appointments, notifications
+from app.services.connection_manager import connection_manager
+from app.services.image_derivatives import image_derivative_service
+from app.services.message_broker import message_broker
+from app.services.password_hasher import password_hasher
+from app.services.principal_cache import principal_cache
+from app.services.refresh_tokens import revoked_families
 from app.services.scheduler import notification_scheduler
+from app.utils.auth import verified_tokens
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.uploads import UPLOADS_DIR, UPLOADS_TMP_DIR, MESSAGE_UPLOADS_DIR, UploadsStaticFiles, remove_stale_temp_files
 
 app = FastAPI(title="DietApp API", version="1.0.0")
 
@@ -15,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(auth.router, prefix="/api")
@@ -25,21 +36,50 @@ app.include_router(messages.router, prefix="/api")
 app.include_router(appointments.router, prefix="/api")
 app.include_router(notifications.router, prefix="/api")
 
-uploads_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
-os.makedirs(os.path.join(uploads_dir, "messages"), exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+os.makedirs(MESSAGE_UPLOADS_DIR, exist_ok=True)
+os.makedirs(UPLOADS_TMP_DIR, exist_ok=True)
+app.mount(
+    "/uploads",
+    UploadsStaticFiles(
+        directory=UPLOADS_DIR,
+        serve_mode=settings.UPLOADS_SERVE_MODE,
+        accel_prefix=settings.UPLOADS_ACCEL_PREFIX,
+    ),
+    name="uploads",
+)
 
 
 @app.on_event("startup")
-def startup_event():
-    notification_scheduler.start()
+async def startup_event():
+    if settings.SCHEDULER_IN_API:
+        notification_scheduler.start()
+    await connection_manager.start()
+    await message_broker.start(messages.deliver_local)
+    remove_stale_temp_files()
+    revoked_families.start()
 
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
+    await message_broker.stop()
+    await connection_manager.stop()
     notification_scheduler.shutdown()
+    image_derivative_service.shutdown()
+    password_hasher.shutdown()
+    revoked_families.stop()
 
 
 @app.get("/")
 def root():
     return {"message": "DietApp API is running"}
+
+
+# Cache counters reveal traffic patterns, so these are not public
+@app.get("/metrics/principal-cache", dependencies=[Depends(require_dietitian)])
+def principal_cache_metrics():
+    return principal_cache.stats()
+
+
+@app.get("/metrics/token-cache", dependencies=[Depends(require_dietitian)])
+def token_cache_metrics():
+    return verified_tokens.stats()
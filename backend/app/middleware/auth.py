@@ -6,32 +6,59 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.user import User
-from app.utils.auth import decode_token
+from app.services.principal_cache import Principal, principal_cache
+from app.services.refresh_tokens import revoked_families
+from app.utils.auth import decode_access_token
 
 security = HTTPBearer()
 
 
+def load_principal(db: Session, user_id: UUID) -> Principal | None:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        row = db.query(User.id, User.role, User.full_name).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        principal_cache.put(principal)
+    return principal
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
-) -> User:
+) -> Principal:
     token = credentials.credentials
-    payload = decode_token(token)
-    if payload is None or payload.get("type") != "access":
+    payload = decode_access_token(token)
+    if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if payload.get("fam") in revoked_families:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
 
     user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == UUID(user_id)).first()
-    if user is None:
+    principal = load_principal(db, UUID(user_id))
+    if principal is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    return principal
+
+
+def get_current_db_user(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> User:
+    # For endpoints that read or change more than the principal carries
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        principal_cache.invalidate(current_user.id)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
-def require_dietitian(current_user: User = Depends(get_current_user)) -> User:
+def require_dietitian(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "dietitian":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Dietitian access required")
     return current_user
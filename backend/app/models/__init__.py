@@ -4,8 +4,13 @@ from app.models.meal import Meal
 from app.models.meal_item import MealItem
 from app.models.weight_log import WeightLog
 from app.models.message import Message
+from app.models.conversation import Conversation, ConversationRead
 from app.models.appointment import Appointment
-from app.models.notification import Notification, ScheduledNotification
+from app.models.notification import Notification, Broadcast, BroadcastReceipt, ScheduledNotification
+from app.models.push import PushJob, PushOutbox, PushAttempt
+from app.models.device_token import DeviceToken
+from app.models.refresh_token import RefreshTokenFamily
+from app.models.upload import ImageUpload
 
 __all__ = [
     "User",
@@ -15,7 +20,17 @@ __all__ = [
     "MealItem",
     "WeightLog",
     "Message",
+    "Conversation",
+    "ConversationRead",
     "Appointment",
     "Notification",
+    "Broadcast",
+    "BroadcastReceipt",
     "ScheduledNotification",
+    "PushJob",
+    "PushOutbox",
+    "PushAttempt",
+    "DeviceToken",
+    "RefreshTokenFamily",
+    "ImageUpload",
 ]
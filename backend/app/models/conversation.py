@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+# One row per user pair, stored ordered (user_a_id < user_b_id) so both directions map to the same row.
+class Conversation(Base):
+    __tablename__ = "conversations"
+    __table_args__ = (
+        UniqueConstraint("user_a_id", "user_b_id", name="uq_conversations_pair"),
+        Index("ix_conversations_user_a_last_message", "user_a_id", "last_message_at"),
+        Index("ix_conversations_user_b_last_message", "user_b_id", "last_message_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_a_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_b_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    last_message_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
+    )
+    last_message_preview: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    last_message_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Unread messages for user_a / user_b respectively
+    unread_count_a: Mapped[int] = mapped_column(Integer, default=0)
+    unread_count_b: Mapped[int] = mapped_column(Integer, default=0)
+
+
+# How far each user has read each conversation; messages from peer_id after the watermark are unread.
+class ConversationRead(Base):
+    __tablename__ = "conversation_reads"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    peer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    last_read_message_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, date
 
-from sqlalchemy import String, Text, Date, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Text, Date, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -10,6 +10,11 @@ from app.database import Base
 
 class DietPlan(Base):
     __tablename__ = "diet_plans"
+    __table_args__ = (
+        Index("ix_diet_plans_dietitian_id_client_id", "dietitian_id", "client_id"),
+        Index("ix_diet_plans_dietitian_id_created_at", "dietitian_id", "created_at"),
+        Index("ix_diet_plans_client_id_created_at", "client_id", "created_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     dietitian_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
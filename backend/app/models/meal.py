@@ -11,7 +11,7 @@ class Meal(Base):
     __tablename__ = "meals"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    diet_plan_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("diet_plans.id"), nullable=False)
+    diet_plan_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("diet_plans.id"), nullable=False, index=True)
     meal_type: Mapped[str] = mapped_column(
         SAEnum("breakfast", "lunch", "dinner", "snack", name="meal_type"), nullable=False
     )
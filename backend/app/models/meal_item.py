@@ -11,7 +11,7 @@ class MealItem(Base):
     __tablename__ = "meal_items"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    meal_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("meals.id"), nullable=False)
+    meal_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("meals.id"), nullable=False, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     amount: Mapped[str | None] = mapped_column(String(100), nullable=True)
     calories: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, ForeignKey, DateTime, Text, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, ForeignKey, DateTime, Text, Boolean, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -9,6 +9,9 @@ from app.database import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -20,8 +23,41 @@ class Notification(Base):
     user: Mapped["User"] = relationship("User")
 
 
+# A notification stored once however many clients get it. An untargeted broadcast goes to every
+# client who existed when it was sent, and per-user read state is only written when they read it.
+# A targeted one is seen only by the clients holding a receipt for it, written when it is sent.
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+    __table_args__ = (
+        Index("ix_broadcasts_untargeted_created_at", "created_at", postgresql_where=text("NOT targeted")),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    targeted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class BroadcastReceipt(Base):
+    __tablename__ = "broadcast_receipts"
+    __table_args__ = (
+        Index("ix_broadcast_receipts_user_id", "user_id"),
+    )
+
+    broadcast_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("broadcasts.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    # NULL until read; only receipts of targeted broadcasts exist before that
+    read_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
 class ScheduledNotification(Base):
     __tablename__ = "scheduled_notifications"
+    __table_args__ = (
+        Index("ix_scheduled_notifications_next_run_at", "next_run_at", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -33,9 +69,17 @@ class ScheduledNotification(Base):
     # For "once": specific date/time. For "daily": HH:MM
     scheduled_time: Mapped[str] = mapped_column(String(50), nullable=False)
     
-    # Target: "all" or specific user_id (optional for now, mainly "all")
+    # Dietitian who scheduled it; rows from before targeting have none and go to every client
+    dietitian_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True
+    )
+    # Target: "all" (the dietitian's active clients), "clients" (target_client_ids)
+    # or a segment: "active_plan" (clients with a diet plan of theirs running today)
     target_type: Mapped[str] = mapped_column(String(50), default="all")
+    target_client_ids: Mapped[list[uuid.UUID] | None] = mapped_column(ARRAY(UUID(as_uuid=True)), nullable=True)
     
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # When the scheduler should send it next (UTC); cleared once a one-time notification is sent
+    next_run_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     last_sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+# One row per stored message image that gets derivatives; derivatives_ready flips once the
+# pool job has written them, so readers never have to look at the disk.
+class ImageUpload(Base):
+    __tablename__ = "image_uploads"
+
+    image_url: Mapped[str] = mapped_column(String(500), primary_key=True)
+    derivatives_ready: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Enum as SAEnum, ForeignKey, DateTime
+from sqlalchemy import String, Integer, Enum as SAEnum, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -17,7 +17,12 @@ class User(Base):
     full_name: Mapped[str] = mapped_column(String(255), nullable=False)
     role: Mapped[str] = mapped_column(SAEnum("dietitian", "client", name="user_role"), nullable=False)
     phone: Mapped[str | None] = mapped_column(String(20), nullable=True)
-    apns_token: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # IANA name; daily notifications reach the user at this local time
+    timezone: Mapped[str] = mapped_column(String(64), default="UTC")
+    # Unread personal notifications and broadcasts, kept in step by NotificationService
+    unread_notification_count: Mapped[int] = mapped_column(Integer, default=0)
+    # "Read all" watermark for broadcasts; later reads are tracked per broadcast
+    broadcasts_read_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -31,6 +36,9 @@ class User(Base):
 
 class DietitianClient(Base):
     __tablename__ = "dietitian_clients"
+    __table_args__ = (
+        Index("ix_dietitian_clients_dietitian_id_client_id", "dietitian_id", "client_id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     dietitian_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -5,8 +5,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
 from app.database import get_db
-from app.middleware.auth import get_current_user, require_dietitian
-from app.models.user import User
+from app.middleware.auth import Principal, get_current_user, require_dietitian
 from app.models.appointment import Appointment
 from app.schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentResponse
 
@@ -14,7 +13,7 @@ router = APIRouter(prefix="/appointments", tags=["appointments"])
 
 
 @router.get("", response_model=list[AppointmentResponse])
-def list_appointments(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_appointments(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.role == "dietitian":
         appts = db.query(Appointment).filter(Appointment.dietitian_id == current_user.id).order_by(Appointment.date_time).all()
     else:
@@ -23,7 +22,7 @@ def list_appointments(current_user: User = Depends(get_current_user), db: Sessio
 
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
-def get_appointment(appointment_id: UUID, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_appointment(appointment_id: UUID, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     appt = db.query(Appointment).filter(Appointment.id == appointment_id).first()
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -35,7 +34,7 @@ def get_appointment(appointment_id: UUID, current_user: User = Depends(get_curre
 @router.post("", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
 def create_appointment(
     appt_data: AppointmentCreate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     appt = Appointment(
@@ -56,7 +55,7 @@ def create_appointment(
 def update_appointment(
     appointment_id: UUID,
     appt_data: AppointmentUpdate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     appt = db.query(Appointment).filter(
@@ -76,7 +75,7 @@ def update_appointment(
 
 @router.delete("/{appointment_id}")
 def delete_appointment(
-    appointment_id: UUID, current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)
+    appointment_id: UUID, current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)
 ):
     appt = db.query(Appointment).filter(
         Appointment.id == appointment_id, Appointment.dietitian_id == current_user.id
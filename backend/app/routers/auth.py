@@ -1,59 +1,115 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token, LoginRequest, TokenRefresh
-from app.utils.auth import hash_password, verify_password, create_access_token, create_refresh_token, decode_token
+from app.services.password_hasher import PasswordHasherBusy, password_hasher
+from app.services.refresh_tokens import refresh_token_service
+from app.utils.auth import decode_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+async def _hashing(call):
+    # Password hashing is capped per worker; past the cap clients are asked to retry
+    try:
+        return await call
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _find_credentials(db: Session, email: str):
+    # Ends its transaction so no pooled connection is held while the password is being hashed
+    try:
+        return db.query(User.id, User.role, User.password_hash).filter(User.email == email).first()
+    finally:
+        db.rollback()
+
+
+def _create_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _update_password_hash(db: Session, user_id: UUID, password_hash: str):
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_data.email).first()
-    if existing:
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    # Async so the hashing wait holds no thread; the short DB calls go to the threadpool
+    if await run_in_threadpool(_find_credentials, db, user_data.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user = User(
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await _hashing(password_hasher.hash(user_data.password)),
         full_name=user_data.full_name,
         role=user_data.role,
         phone=user_data.phone,
+        timezone=user_data.timezone,
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_create_user, db, user)
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == login_data.email).first()
-    if not user or not verify_password(login_data.password, user.password_hash):
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_credentials, db, login_data.email)
+    if not user or not await _hashing(password_hasher.verify(login_data.password, user.password_hash)):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    return Token(
-        access_token=create_access_token(user.id, user.role),
-        refresh_token=create_refresh_token(user.id),
-    )
+    if password_hasher.needs_rehash(user.password_hash):
+        # BCRYPT_ROUNDS changed since this hash was made; the login has the plain password to redo it
+        try:
+            new_hash = await password_hasher.hash(login_data.password)
+        except PasswordHasherBusy:
+            pass
+        else:
+            await run_in_threadpool(_update_password_hash, db, user.id, new_hash)
+
+    access_token, refresh_token = await run_in_threadpool(refresh_token_service.issue, db, user.id, user.role)
+    return Token(access_token=access_token, refresh_token=refresh_token)
+
+
+def _refresh_payload(token: str) -> dict:
+    payload = decode_token(token)
+    if payload is None or payload.get("type") != "refresh" or "fam" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
 
 
 @router.post("/refresh", response_model=Token)
 def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
-    payload = decode_token(token_data.refresh_token)
-    if payload is None or payload.get("type") != "refresh":
+    pair = refresh_token_service.rotate(db, _refresh_payload(token_data.refresh_token))
+    if pair is None:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == UUID(user_id)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    access_token, refresh_token = pair
+    return Token(access_token=access_token, refresh_token=refresh_token)
 
-    return Token(
-        access_token=create_access_token(user.id, user.role),
-        refresh_token=create_refresh_token(user.id),
-    )
+
+@router.post("/logout")
+def logout(token_data: TokenRefresh, all: bool = False, db: Session = Depends(get_db)):
+    # Ends the session the refresh token belongs to, or every session of its user with all=true.
+    # Access tokens of those sessions stop working straight away on this worker and within
+    # REVOCATION_SYNC_SECONDS on the others.
+    payload = _refresh_payload(token_data.refresh_token)
+    if all:
+        # Signing out every device takes the session's current token, not an old or leaked one
+        if not refresh_token_service.is_current(db, payload):
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        refresh_token_service.revoke_user(db, UUID(payload["sub"]))
+    else:
+        refresh_token_service.revoke_family(db, UUID(payload["fam"]))
+    return {"message": "Logged out"}
@@ -1,18 +1,22 @@
+from datetime import date
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
-from app.middleware.auth import get_current_user, require_dietitian
-from app.models.user import User
+from app.middleware.auth import Principal, get_current_user, require_dietitian
 from app.models.diet_plan import DietPlan
 from app.models.meal import Meal
 from app.models.meal_item import MealItem
+from app.services.diet_plan_service import diet_plan_service
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor
 from app.schemas.diet_plan import (
     DietPlanCreate,
     DietPlanUpdate,
     DietPlanResponse,
+    DietPlanSummary,
     MealCreate,
     MealUpdate,
     MealResponse,
@@ -24,20 +28,31 @@ from app.schemas.diet_plan import (
 router = APIRouter(prefix="/diet-plans", tags=["diet-plans"])
 
 
-@router.get("", response_model=list[DietPlanResponse])
-def list_diet_plans(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    query = db.query(DietPlan).options(
-        joinedload(DietPlan.meals).joinedload(Meal.items)
-    )
+@router.get("", response_model=list[DietPlanSummary] | list[DietPlanResponse])
+def list_diet_plans(
+    response: Response,
+    view: Literal["summary", "full"] = "full",
+    is_active: bool | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     if current_user.role == "dietitian":
-        plans = query.filter(DietPlan.dietitian_id == current_user.id).all()
+        owner = DietPlan.dietitian_id == current_user.id
     else:
-        plans = query.filter(DietPlan.client_id == current_user.id).all()
+        owner = DietPlan.client_id == current_user.id
+    before = decode_cursor(cursor) if cursor else None
+    plans, next_cursor = diet_plan_service.list_page(db, owner, view, is_active, from_date, to_date, before, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return plans
 
 
 @router.get("/{plan_id}", response_model=DietPlanResponse)
-def get_diet_plan(plan_id: UUID, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_diet_plan(plan_id: UUID, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     plan = (
         db.query(DietPlan)
         .options(joinedload(DietPlan.meals).joinedload(Meal.items))
@@ -56,7 +71,7 @@ def get_diet_plan(plan_id: UUID, current_user: User = Depends(get_current_user),
 @router.post("", response_model=DietPlanResponse, status_code=status.HTTP_201_CREATED)
 def create_diet_plan(
     plan_data: DietPlanCreate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = DietPlan(
@@ -91,7 +106,7 @@ def create_diet_plan(
 def update_diet_plan(
     plan_id: UUID,
     plan_data: DietPlanUpdate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
@@ -108,7 +123,7 @@ def update_diet_plan(
 
 
 @router.delete("/{plan_id}")
-def delete_diet_plan(plan_id: UUID, current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)):
+def delete_diet_plan(plan_id: UUID, current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Diet plan not found")
@@ -122,7 +137,7 @@ def delete_diet_plan(plan_id: UUID, current_user: User = Depends(require_dietiti
 def add_meal(
     plan_id: UUID,
     meal_data: MealCreate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
@@ -149,7 +164,7 @@ def update_meal(
     plan_id: UUID,
     meal_id: UUID,
     meal_data: MealUpdate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     meal = db.query(Meal).filter(Meal.id == meal_id, Meal.diet_plan_id == plan_id).first()
@@ -169,7 +184,7 @@ def update_meal(
 def delete_meal(
     plan_id: UUID,
     meal_id: UUID,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     meal = db.query(Meal).filter(Meal.id == meal_id, Meal.diet_plan_id == plan_id).first()
@@ -186,7 +201,7 @@ def add_meal_item(
     plan_id: UUID,
     meal_id: UUID,
     item_data: MealItemCreate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
@@ -210,7 +225,7 @@ def update_meal_item(
     meal_id: UUID,
     item_id: UUID,
     item_data: MealItemUpdate,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
@@ -235,7 +250,7 @@ def delete_meal_item(
     plan_id: UUID,
     meal_id: UUID,
     item_id: UUID,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     plan = db.query(DietPlan).filter(DietPlan.id == plan_id, DietPlan.dietitian_id == current_user.id).first()
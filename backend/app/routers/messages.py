@@ -1,92 +1,135 @@
+import asyncio
+import hashlib
 import json
+import logging
 import os
-import uuid as uuid_mod
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import or_, and_, case, func, select, tuple_, union_all
 
+from app.config import settings
 from app.database import get_db, SessionLocal
-from app.middleware.auth import get_current_user
+from app.middleware.auth import Principal, get_current_user, load_principal
 from app.models.user import User
 from app.models.message import Message
-from app.schemas.message import MessageCreate, MessageResponse, ConversationResponse
-from app.utils.auth import decode_token
+from app.models.conversation import Conversation
+from app.schemas.message import MessageCreate, MessageResponse, MessageSearchResult, ConversationResponse
+from app.utils.auth import decode_access_token
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.utils.uploads import (
+    MESSAGE_UPLOADS_DIR,
+    MESSAGE_UPLOADS_URL,
+    UPLOADS_TMP_DIR,
+    DERIVATIVE_SOURCE_EXTENSIONS,
+    derivative_url,
+)
+from app.services.connection_manager import connection_manager
+from app.services.image_derivatives import image_derivative_service
+from app.services.message_broker import message_broker
+from app.services.message_service import message_service
+from app.services.refresh_tokens import revoked_families
 from app.services.notification_service import notification_service
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
-# WebSocket connection manager
-active_connections: dict[str, WebSocket] = {}
+logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads", "messages")
+chat_db_executor = ThreadPoolExecutor(max_workers=settings.CHAT_DB_THREADS, thread_name_prefix="chat-db")
+
+UPLOAD_DIR = MESSAGE_UPLOADS_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(UPLOADS_TMP_DIR, exist_ok=True)
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
+# Must match the configuration of the messages.content_tsv generated column
+SEARCH_TEXT_CONFIG = "turkish"
 
-@router.get("/conversations", response_model=list[ConversationResponse])
-def get_conversations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    sent_to = db.query(Message.receiver_id).filter(Message.sender_id == current_user.id).distinct()
-    received_from = db.query(Message.sender_id).filter(Message.receiver_id == current_user.id).distinct()
-
-    user_ids = set()
-    for (uid,) in sent_to:
-        user_ids.add(uid)
-    for (uid,) in received_from:
-        user_ids.add(uid)
-
-    conversations = []
-    for uid in user_ids:
-        user = db.query(User).filter(User.id == uid).first()
-        if not user:
-            continue
-
-        last_msg = (
-            db.query(Message)
-            .filter(
-                or_(
-                    and_(Message.sender_id == current_user.id, Message.receiver_id == uid),
-                    and_(Message.sender_id == uid, Message.receiver_id == current_user.id),
-                )
-            )
-            .order_by(Message.created_at.desc())
-            .first()
-        )
 
-        unread = (
-            db.query(func.count(Message.id))
-            .filter(Message.sender_id == uid, Message.receiver_id == current_user.id, Message.is_read == False)
-            .scalar()
+@router.get("/conversations", response_model=list[ConversationResponse])
+def get_conversations(
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Without a limit every conversation is returned, for clients that don't page
+    is_user_a = Conversation.user_a_id == current_user.id
+    partner_id = case((is_user_a, Conversation.user_b_id), else_=Conversation.user_a_id)
+    unread_count = case((is_user_a, Conversation.unread_count_a), else_=Conversation.unread_count_b)
+
+    query = (
+        db.query(Conversation, partner_id, User.full_name, unread_count)
+        .join(User, User.id == partner_id)
+        .filter(or_(Conversation.user_a_id == current_user.id, Conversation.user_b_id == current_user.id))
+    )
+    if cursor:
+        last_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Conversation.last_message_at, Conversation.id) < tuple_(last_at, last_id))
+
+    query = query.order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = query.all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.last_message_at, last.id)
+
+    return [
+        ConversationResponse(
+            user_id=uid,
+            full_name=full_name,
+            last_message=conversation.last_message_preview,
+            last_message_at=conversation.last_message_at,
+            unread_count=unread or 0,
         )
+        for conversation, uid, full_name, unread in rows
+    ]
 
-        if last_msg:
-            last_message_text = last_msg.content if last_msg.content else "[Fotoğraf]"
-            conversations.append(
-                ConversationResponse(
-                    user_id=uid,
-                    full_name=user.full_name,
-                    last_message=last_message_text,
-                    last_message_at=last_msg.created_at,
-                    unread_count=unread or 0,
-                )
-            )
 
-    conversations.sort(key=lambda c: c.last_message_at, reverse=True)
-    return conversations
+def _store_upload(source: BinaryIO, ext: str) -> str | None:
+    # Copies the upload in chunks while hashing it; returns None as soon as it exceeds MAX_FILE_SIZE.
+    # Files are named by their SHA-256, so a re-sent photo maps to the blob already on disk.
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOADS_TMP_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    return None
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        filename = f"{digest.hexdigest()}.{ext}"
+        filepath = os.path.join(UPLOAD_DIR, filename)
+        if not os.path.exists(filepath):
+            os.replace(tmp_path, filepath)
+        return filename
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 @router.post("/upload")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Sadece resim dosyaları yüklenebilir")
-
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="Dosya boyutu 10MB'dan büyük olamaz")
 
     ext = file.filename.rsplit(".", 1)[-1].lower() if file.filename and "." in file.filename else "jpg"
@@ -94,133 +137,251 @@ async def upload_image(
     if ext not in allowed_ext:
         ext = "jpg"
 
-    filename = f"{uuid_mod.uuid4()}.{ext}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
+    # File I/O and hashing run off the event loop
+    filename = await run_in_threadpool(_store_upload, file.file, ext)
+    if filename is None:
+        raise HTTPException(status_code=400, detail="Dosya boyutu 10MB'dan büyük olamaz")
+
+    image_url = f"{MESSAGE_UPLOADS_URL}{filename}"
+    derivatives_ready = False
+    if ext in DERIVATIVE_SOURCE_EXTENSIONS:
+        path = os.path.join(UPLOAD_DIR, filename)
+        # Recorded before the job is queued, so the job always finds the row it marks ready
+        derivatives_ready = await run_in_threadpool(_register_upload, image_url, path)
+        if not derivatives_ready:
+            image_derivative_service.schedule(path, _mark_derivatives_ready)
+
+    return {
+        "image_url": image_url,
+        "thumbnail_url": derivative_url(image_url, "thumb", derivatives_ready),
+        "preview_url": derivative_url(image_url, "preview", derivatives_ready),
+    }
+
+
+def _register_upload(image_url: str, path: str) -> bool:
+    # A re-sent photo may already have its derivatives on disk
+    derivatives_ready = image_derivative_service.is_complete(path)
+    db = SessionLocal()
+    try:
+        message_service.record_upload(db, image_url, derivatives_ready)
+    finally:
+        db.close()
+    return derivatives_ready
 
-    with open(filepath, "wb") as f:
-        f.write(content)
 
-    return {"image_url": f"/uploads/messages/{filename}"}
+def _mark_derivatives_ready(path: str):
+    # Runs on the pool's result thread once the job has written every derivative
+    db = SessionLocal()
+    try:
+        message_service.mark_derivatives_ready(db, MESSAGE_UPLOADS_URL + os.path.basename(path))
+    finally:
+        db.close()
 
 
 @router.get("/unread-count")
-def get_unread_count(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    count = (
-        db.query(func.count(Message.id))
-        .filter(Message.receiver_id == current_user.id, Message.is_read == False)
-        .scalar()
-    )
-    return {"count": count or 0}
-
+def get_unread_count(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return {"count": message_service.unread_count(db, current_user.id)}
+
+
+@router.get("/search", response_model=list[MessageSearchResult])
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: UUID | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    ts_query = func.websearch_to_tsquery(SEARCH_TEXT_CONFIG, q)
+    rank = func.ts_rank(Message.content_tsv, ts_query)
 
-@router.get("/{user_id}", response_model=list[MessageResponse])
-def get_messages(user_id: UUID, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    messages = (
-        db.query(Message)
-        .filter(
+    query = db.query(Message, rank).filter(Message.content_tsv.op("@@")(ts_query))
+    if user_id:
+        query = query.filter(
             or_(
                 and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
                 and_(Message.sender_id == user_id, Message.receiver_id == current_user.id),
             )
         )
-        .order_by(Message.created_at)
-        .all()
-    )
+    else:
+        query = query.filter(or_(Message.sender_id == current_user.id, Message.receiver_id == current_user.id))
 
-    # Mark messages from the other user as read
-    db.query(Message).filter(
-        Message.sender_id == user_id, Message.receiver_id == current_user.id, Message.is_read == False
-    ).update({"is_read": True})
-    db.commit()
+    rows = query.order_by(rank.desc(), Message.created_at.desc()).offset(offset).limit(limit).all()
 
-    return messages
+    read_flags = message_service.read_flags(db, current_user.id, [message for message, _ in rows])
+    results = []
+    for (message, message_rank), is_read in zip(rows, read_flags):
+        result = MessageSearchResult.model_validate(message)
+        result.rank = message_rank
+        result.is_read = is_read
+        results.append(result)
+    return results
+
+
+@router.get("/{user_id}", response_model=list[MessageResponse])
+def get_messages(
+    user_id: UUID,
+    response: Response,
+    before: str | None = None,
+    after: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    # Newer messages after the cursor are walked oldest first; the latest page (or the page
+    # before a cursor) newest first, and returned oldest first either way
+    forward = after is not None
+    cursor = decode_cursor(after or before) if (after or before) else None
+
+    # Each direction is paged on its own so it walks the conversation index in order
+    parts = [
+        _page_direction(current_user.id, user_id, cursor, forward, limit + 1),
+        _page_direction(user_id, current_user.id, cursor, forward, limit + 1),
+    ]
+    page = aliased(Message, union_all(*parts).subquery())
+    order = (page.created_at, page.id) if forward else (page.created_at.desc(), page.id.desc())
+    # One row past the limit tells whether another page follows
+    messages = db.query(page).order_by(*order).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not forward:
+        messages.reverse()
+
+    if has_more:
+        # The cursor points at the newest message returned going forward, the oldest otherwise
+        cursor_message = messages[-1] if forward else messages[0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(cursor_message.created_at, cursor_message.id)
+
+    # Read state comes from each side's watermark rather than per-row flags
+    read_flags = message_service.read_flags(db, current_user.id, messages)
+    result = []
+    for message, is_read in zip(messages, read_flags):
+        msg_response = MessageResponse.model_validate(message)
+        msg_response.is_read = is_read
+        result.append(msg_response)
+    return result
+
+
+def _page_direction(sender_id: UUID, receiver_id: UUID, cursor: tuple | None, forward: bool, limit: int):
+    query = select(Message).where(Message.sender_id == sender_id, Message.receiver_id == receiver_id)
+    position = tuple_(Message.created_at, Message.id)
+    if cursor:
+        query = query.where(position > tuple_(*cursor) if forward else position < tuple_(*cursor))
+    if forward:
+        return query.order_by(Message.created_at, Message.id).limit(limit)
+    return query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+
+
+@router.post("/{user_id}/read")
+def mark_messages_read(user_id: UUID, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    watermark = message_service.mark_conversation_read(db, current_user.id, user_id)
+    return {"last_read_message_at": watermark}
 
 
 @router.post("", response_model=MessageResponse, status_code=201)
-def send_message(msg_data: MessageCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    message = Message(
-        sender_id=current_user.id,
-        receiver_id=msg_data.receiver_id,
-        content=msg_data.content,
-        image_url=msg_data.image_url,
+def send_message(msg_data: MessageCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    message = message_service.create_message(
+        db, current_user.id, msg_data.receiver_id, msg_data.content, msg_data.image_url
     )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
+    msg_response = MessageResponse.model_validate(message)
 
     # Send push notification to receiver
     receiver = db.query(User).filter(User.id == msg_data.receiver_id).first()
-    if receiver and receiver.apns_token:
+    if receiver and notification_service.has_devices(db, receiver.id):
         sender_name = current_user.full_name
         body = msg_data.content if msg_data.content else "Yeni bir fotoğraf gönderdi"
         notification_service.send_push_notification(
             db, receiver, f"{sender_name}", f"{body}"
         )
 
-    # Send via WebSocket if receiver is online
-    receiver_key = str(msg_data.receiver_id)
-    if receiver_key in active_connections:
-        import asyncio
+    # Send via WebSocket to whichever workers hold the participants' sockets
+    try:
+        anyio.from_thread.run(publish_to_participants, msg_response)
+    except Exception as e:
+        logger.error(f"Failed to publish message {message.id}: {e}")
+
+    return msg_response
+
+
+def _load_sender_name(user_id: UUID) -> str:
+    db = SessionLocal()
+    try:
+        sender = load_principal(db, user_id)
+        return sender.full_name if sender else "Birisi"
+    finally:
+        db.close()
 
-        ws = active_connections[receiver_key]
+
+def _persist_ws_message(sender_id: UUID, sender_name: str, msg_data: dict) -> MessageResponse:
+    db = SessionLocal()
+    try:
+        receiver_id = UUID(msg_data["receiver_id"])
+        message = message_service.create_message(
+            db,
+            sender_id,
+            receiver_id,
+            msg_data.get("content"),
+            msg_data.get("image_url"),
+        )
         msg_response = MessageResponse.model_validate(message)
-        try:
-            asyncio.create_task(ws.send_text(msg_response.model_dump_json()))
-        except Exception:
-            pass
 
-    return message
+        # Send push notification to receiver
+        receiver = db.query(User).filter(User.id == receiver_id).first()
+        if receiver and notification_service.has_devices(db, receiver.id):
+            body = msg_data.get("content") or "Yeni bir fotoğraf gönderdi"
+            notification_service.send_push_notification(
+                db, receiver, f"{sender_name}", f"{body}"
+            )
+        return msg_response
+    finally:
+        db.close()
 
 
 @router.websocket("/ws/{token}")
 async def websocket_endpoint(websocket: WebSocket, token: str):
-    payload = decode_token(token)
-    if not payload or payload.get("type") != "access":
+    payload = decode_access_token(token)
+    if not payload or payload.get("fam") in revoked_families:
         await websocket.close(code=1008)
         return
 
     user_id = payload.get("sub")
     await websocket.accept()
-    active_connections[user_id] = websocket
+    connection = connection_manager.connect(user_id, websocket)
+
+    # Database work runs on a bounded pool so a slow query never stalls the event loop
+    loop = asyncio.get_running_loop()
 
     try:
+        sender_name = await loop.run_in_executor(chat_db_executor, _load_sender_name, UUID(user_id))
         while True:
             data = await websocket.receive_text()
+            connection_manager.touch(connection)
             msg_data = json.loads(data)
+            if msg_data.get("type") == "pong":
+                continue
 
-            db = SessionLocal()
+            msg_response = await loop.run_in_executor(
+                chat_db_executor, _persist_ws_message, UUID(user_id), sender_name, msg_data
+            )
             try:
-                message = Message(
-                    sender_id=UUID(user_id),
-                    receiver_id=UUID(msg_data["receiver_id"]),
-                    content=msg_data.get("content"),
-                    image_url=msg_data.get("image_url"),
-                )
-                db.add(message)
-                db.commit()
-                db.refresh(message)
-
-                msg_response = MessageResponse.model_validate(message)
-                msg_json = msg_response.model_dump_json()
-
-                # Send push notification to receiver
-                receiver = db.query(User).filter(User.id == UUID(msg_data["receiver_id"])).first()
-                sender = db.query(User).filter(User.id == UUID(user_id)).first()
-                if receiver and receiver.apns_token:
-                    body = msg_data.get("content") or "Yeni bir fotoğraf gönderdi"
-                    sender_name = sender.full_name if sender else "Birisi"
-                    notification_service.send_push_notification(
-                        db, receiver, f"{sender_name}", f"{body}"
-                    )
-
-                # Send to sender
-                await websocket.send_text(msg_json)
-
-                # Send to receiver if online
-                receiver_key = msg_data["receiver_id"]
-                if receiver_key in active_connections:
-                    await active_connections[receiver_key].send_text(msg_json)
-            finally:
-                db.close()
+                await publish_to_participants(msg_response)
+            except Exception as e:
+                logger.error(f"Failed to publish message {msg_response.id}: {e}")
     except WebSocketDisconnect:
-        active_connections.pop(user_id, None)
+        pass
+    finally:
+        connection_manager.disconnect(connection)
+
+
+async def publish_to_participants(msg_response: MessageResponse):
+    # Both sides get the message on every device, wherever they are connected
+    await message_broker.publish(str(msg_response.sender_id), msg_response)
+    if msg_response.receiver_id != msg_response.sender_id:
+        await message_broker.publish(str(msg_response.receiver_id), msg_response)
+
+
+async def deliver_local(user_id: str, payload: str):
+    connection_manager.send(user_id, payload)
@@ -1,14 +1,19 @@
 import re
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import Literal
 
 from app.database import get_db
-from app.middleware.auth import get_current_user
+from app.middleware.auth import Principal, get_current_db_user, get_current_user
 from app.models.user import User
-from app.models.notification import Notification, ScheduledNotification
+from app.models.notification import ScheduledNotification
+from app.schemas.notification import NotificationResponse
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.services.notification_service import notification_service
+from app.services.scheduler import first_run_at, notification_scheduler, parse_once_time
 from pydantic import BaseModel, field_validator
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
@@ -21,7 +26,10 @@ class ScheduledNotificationCreate(BaseModel):
     title: str
     content: str
     schedule_type: Literal["once", "daily"]
-    scheduled_time: str  # ISO format for "once", "HH:MM" for "daily"
+    scheduled_time: str  # ISO format for "once", "HH:MM" (each client's local time) for "daily"
+    # "all" of my active clients, the "clients" in client_ids, or the "active_plan" segment
+    target_type: Literal["all", "clients", "active_plan"] = "all"
+    client_ids: list[UUID] | None = None
 
     @field_validator("scheduled_time")
     @classmethod
@@ -33,60 +41,107 @@ class ScheduledNotificationCreate(BaseModel):
             hour, minute = map(int, v.split(":"))
             if not (0 <= hour <= 23 and 0 <= minute <= 59):
                 raise ValueError("Invalid time value")
+        elif schedule_type == "once":
+            try:
+                parse_once_time(v)
+            except ValueError:
+                raise ValueError("One-time notifications require an ISO datetime")
         return v
 
-@router.post("/send-bulk")
+@router.post("/send-bulk", status_code=202)
 def send_bulk_notification(
     data: BulkNotificationRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role != "dietitian":
         raise HTTPException(status_code=403, detail="Only dietitians can send bulk notifications")
     
-    notification_service.send_bulk_push(db, data.title, data.content)
-    return {"message": "Bulk notifications sent successfully"}
+    job = notification_service.send_bulk_push(db, data.title, data.content)
+    return notification_service.job_progress(db, job.id)
+
+@router.get("/bulk-jobs/{job_id}")
+def get_bulk_job(
+    job_id: UUID,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if current_user.role != "dietitian":
+        raise HTTPException(status_code=403, detail="Only dietitians can view bulk notification jobs")
+
+    progress = notification_service.job_progress(db, job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress
 
 @router.post("/schedule")
 def schedule_notification(
     data: ScheduledNotificationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role != "dietitian":
         raise HTTPException(status_code=403, detail="Only dietitians can schedule notifications")
-    
+
+    client_ids = None
+    if data.target_type == "clients":
+        client_ids = list(dict.fromkeys(data.client_ids or []))
+    audience = notification_service.audience(current_user.id, data.target_type, client_ids)
+    if data.target_type == "clients" and (not client_ids or len(db.execute(audience).all()) != len(client_ids)):
+        raise HTTPException(status_code=400, detail="client_ids must list your active clients")
+
+    timezones = None
+    if data.schedule_type == "daily":
+        timezones = notification_service.audience_timezones(db, audience)
+
     scheduled = ScheduledNotification(
         title=data.title,
         content=data.content,
         schedule_type=data.schedule_type,
-        scheduled_time=data.scheduled_time
+        scheduled_time=data.scheduled_time,
+        dietitian_id=current_user.id,
+        target_type=data.target_type,
+        target_client_ids=client_ids,
+        next_run_at=first_run_at(data.schedule_type, data.scheduled_time, datetime.utcnow(), timezones)
     )
     db.add(scheduled)
+    notification_scheduler.notify_schedule_changed(db, scheduled.next_run_at)
     db.commit()
     db.refresh(scheduled)
     return scheduled
 
 @router.get("/scheduled")
 def get_scheduled_notifications(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role != "dietitian":
         raise HTTPException(status_code=403, detail="Only dietitians can view scheduled notifications")
     
-    return db.query(ScheduledNotification).order_by(ScheduledNotification.created_at.desc()).all()
+    return (
+        db.query(ScheduledNotification)
+        .filter(or_(ScheduledNotification.dietitian_id == current_user.id, ScheduledNotification.dietitian_id.is_(None)))
+        .order_by(ScheduledNotification.created_at.desc())
+        .all()
+    )
 
 @router.delete("/scheduled/{id}")
 def cancel_scheduled_notification(
     id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role != "dietitian":
         raise HTTPException(status_code=403, detail="Only dietitians can cancel notifications")
     
-    scheduled = db.query(ScheduledNotification).filter(ScheduledNotification.id == id).first()
+    scheduled = (
+        db.query(ScheduledNotification)
+        .filter(
+            ScheduledNotification.id == id,
+            or_(ScheduledNotification.dietitian_id == current_user.id, ScheduledNotification.dietitian_id.is_(None)),
+        )
+        .first()
+    )
     if not scheduled:
         raise HTTPException(status_code=404, detail="Notification not found")
     
@@ -94,56 +149,67 @@ def cancel_scheduled_notification(
     db.commit()
     return {"message": "Scheduled notification cancelled"}
 
-@router.get("")
+@router.get("", response_model=list[NotificationResponse])
 def list_my_notifications(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
-    return (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .all()
-    )
+    # Without a limit the whole feed is returned, for clients that don't page
+    before = decode_cursor(cursor) if cursor else None
+    rows = db.execute(notification_service.feed(current_user, before, None if limit is None else limit + 1)).all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
+
+
+@router.get("/unread-count")
+def get_unread_count(
+    current_user: User = Depends(get_current_db_user),
+    db: Session = Depends(get_db)
+):
+    return {"count": notification_service.unread_count(db, current_user)}
 
 
 @router.post("/{notification_id}/read")
 def mark_notification_read(
     notification_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
-    notification = (
-        db.query(Notification)
-        .filter(Notification.id == notification_id, Notification.user_id == current_user.id)
-        .first()
-    )
-    if not notification:
+    if not notification_service.mark_read(db, current_user, notification_id):
         raise HTTPException(status_code=404, detail="Notification not found")
-    notification.is_read = True
-    db.commit()
     return {"message": "Notification marked as read"}
 
 
 @router.post("/read-all")
 def mark_all_notifications_read(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
-    db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).update({"is_read": True})
-    db.commit()
+    notification_service.mark_all_read(db, current_user)
     return {"message": "All notifications marked as read"}
 
 
 @router.post("/register-token")
 def register_apns_token(
     token: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    current_user.apns_token = token
-    db.commit()
+    notification_service.register_device(db, current_user.id, token)
     return {"message": "APNs token registered successfully"}
+
+
+@router.delete("/register-token")
+def unregister_apns_token(
+    token: str,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not notification_service.unregister_device(db, current_user.id, token):
+        raise HTTPException(status_code=404, detail="Token not found")
+    return {"message": "APNs token removed"}
@@ -1,40 +1,47 @@
+from datetime import date
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.middleware.auth import get_current_user, require_dietitian
+from app.middleware.auth import Principal, get_current_db_user, require_dietitian
 from app.models.user import User, DietitianClient
 from app.models.diet_plan import DietPlan
-from app.models.meal import Meal
 from app.models.meal_item import MealItem
 from app.models.appointment import Appointment
+from app.services.diet_plan_service import diet_plan_service
+from app.services.principal_cache import principal_cache
 from app.schemas.user import UserResponse, UserUpdate, ClientWithStatus
-from app.schemas.diet_plan import DietPlanResponse
+from app.schemas.diet_plan import DietPlanResponse, DietPlanSummary
 from app.schemas.appointment import AppointmentResponse
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: User = Depends(get_current_db_user)):
     return current_user
 
 
 @router.put("/me", response_model=UserResponse)
-def update_me(user_data: UserUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_me(user_data: UserUpdate, current_user: User = Depends(get_current_db_user), db: Session = Depends(get_db)):
     if user_data.full_name is not None:
         current_user.full_name = user_data.full_name
     if user_data.phone is not None:
         current_user.phone = user_data.phone
+    if user_data.timezone is not None:
+        current_user.timezone = user_data.timezone
     db.commit()
+    principal_cache.invalidate(current_user.id)
     db.refresh(current_user)
     return current_user
 
 
 @router.get("/clients", response_model=list[ClientWithStatus])
-def get_my_clients(current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)):
+def get_my_clients(current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)):
     relations = (
         db.query(DietitianClient)
         .filter(DietitianClient.dietitian_id == current_user.id)
@@ -51,7 +58,7 @@ def get_my_clients(current_user: User = Depends(require_dietitian), db: Session
 
 
 @router.post("/clients/{client_id}", status_code=status.HTTP_201_CREATED)
-def add_client(client_id: UUID, current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)):
+def add_client(client_id: UUID, current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)):
     client = db.query(User).filter(User.id == client_id, User.role == "client").first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -71,7 +78,7 @@ def add_client(client_id: UUID, current_user: User = Depends(require_dietitian),
 
 
 @router.delete("/clients/{client_id}")
-def remove_client(client_id: UUID, current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)):
+def remove_client(client_id: UUID, current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)):
     relation = (
         db.query(DietitianClient)
         .filter(DietitianClient.dietitian_id == current_user.id, DietitianClient.client_id == client_id)
@@ -86,7 +93,7 @@ def remove_client(client_id: UUID, current_user: User = Depends(require_dietitia
 
 
 @router.get("/clients/{client_id}", response_model=ClientWithStatus)
-def get_client(client_id: UUID, current_user: User = Depends(require_dietitian), db: Session = Depends(get_db)):
+def get_client(client_id: UUID, current_user: Principal = Depends(require_dietitian), db: Session = Depends(get_db)):
     relation = (
         db.query(DietitianClient)
         .filter(DietitianClient.dietitian_id == current_user.id, DietitianClient.client_id == client_id)
@@ -102,26 +109,31 @@ def get_client(client_id: UUID, current_user: User = Depends(require_dietitian),
     return client_data
 
 
-@router.get("/clients/{client_id}/diet-plans", response_model=list[DietPlanResponse])
+@router.get("/clients/{client_id}/diet-plans", response_model=list[DietPlanSummary] | list[DietPlanResponse])
 def get_client_diet_plans(
     client_id: UUID,
-    current_user: User = Depends(require_dietitian),
+    response: Response,
+    view: Literal["summary", "full"] = "full",
+    is_active: bool | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
-    plans = (
-        db.query(DietPlan)
-        .options(joinedload(DietPlan.meals).joinedload(Meal.items))
-        .filter(DietPlan.client_id == client_id, DietPlan.dietitian_id == current_user.id)
-        .order_by(DietPlan.created_at.desc())
-        .all()
-    )
+    owner = (DietPlan.client_id == client_id) & (DietPlan.dietitian_id == current_user.id)
+    before = decode_cursor(cursor) if cursor else None
+    plans, next_cursor = diet_plan_service.list_page(db, owner, view, is_active, from_date, to_date, before, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return plans
 
 
 @router.get("/clients/{client_id}/appointments", response_model=list[AppointmentResponse])
 def get_client_appointments(
     client_id: UUID,
-    current_user: User = Depends(require_dietitian),
+    current_user: Principal = Depends(require_dietitian),
     db: Session = Depends(get_db),
 ):
     appts = (
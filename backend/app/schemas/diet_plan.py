@@ -101,3 +101,15 @@ class DietPlanResponse(DietPlanBase):
     meals: list[MealResponse] = []
 
     model_config = {"from_attributes": True}
+
+
+# Plan header for list views, with figures aggregated from its meals
+class DietPlanSummary(DietPlanBase):
+    id: UUID
+    dietitian_id: UUID
+    client_id: UUID
+    created_at: datetime
+    meal_count: int
+    total_calories: int
+
+    model_config = {"from_attributes": True}
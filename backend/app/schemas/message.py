@@ -1,7 +1,9 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, computed_field, model_validator
+
+from app.utils.uploads import derivative_url
 
 
 class MessageCreate(BaseModel):
@@ -24,9 +26,25 @@ class MessageResponse(BaseModel):
     image_url: str | None
     is_read: bool
     created_at: datetime
+    derivatives_ready: bool = Field(default=False, exclude=True)
 
     model_config = {"from_attributes": True}
 
+    # Downscaled WebP copies generated after upload; these are image_url until the copies exist
+    @computed_field
+    @property
+    def thumbnail_url(self) -> str | None:
+        return derivative_url(self.image_url, "thumb", self.derivatives_ready)
+
+    @computed_field
+    @property
+    def preview_url(self) -> str | None:
+        return derivative_url(self.image_url, "preview", self.derivatives_ready)
+
+
+class MessageSearchResult(MessageResponse):
+    rank: float = 0.0
+
 
 class ConversationResponse(BaseModel):
     user_id: UUID
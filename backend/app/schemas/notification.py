@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class NotificationResponse(BaseModel):
+    id: UUID
+    user_id: UUID
+    title: str
+    content: str
+    is_read: bool
+    created_at: datetime
+    kind: Literal["personal", "broadcast"] = "personal"
+
+    model_config = {"from_attributes": True}
@@ -1,13 +1,26 @@
 from datetime import datetime
 from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
+
+
+def validate_timezone(v: str | None) -> str | None:
+    if v is not None:
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError("Unknown timezone, expected an IANA name such as Europe/Istanbul")
+    return v
 
 
 class UserBase(BaseModel):
     email: EmailStr
     full_name: str
     phone: str | None = None
+    timezone: str = "UTC"
+
+    _validate_timezone = field_validator("timezone")(validate_timezone)
 
 
 class UserCreate(UserBase):
@@ -18,6 +31,9 @@ class UserCreate(UserBase):
 class UserUpdate(BaseModel):
     full_name: str | None = None
     phone: str | None = None
+    timezone: str | None = None
+
+    _validate_timezone = field_validator("timezone")(validate_timezone)
 
 
 class UserResponse(UserBase):
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import time
+
+from fastapi import WebSocket
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PING_FRAME = json.dumps({"type": "ping"})
+# Close code 1013 ("try again later") tells clients to reconnect and refetch history
+SLOW_CONSUMER_CLOSE_CODE = 1013
+HEARTBEAT_CLOSE_CODE = 1001
+
+
+class Connection:
+    def __init__(self, user_id: str, websocket: WebSocket, queue_size: int):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self.sender_task: asyncio.Task | None = None
+
+
+class ConnectionManager:
+    # Tracks every socket of every user on this worker. Each socket has a bounded outbound
+    # queue drained by its own task, so a slow reader never blocks delivery to anyone else.
+
+    def __init__(
+        self,
+        queue_size: int,
+        overflow_policy: str,
+        heartbeat_interval: float,
+        heartbeat_timeout: float,
+    ):
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy  # "drop" or "close"
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.connections: dict[str, set[Connection]] = {}
+        self._heartbeat_task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._heartbeat_task is None and self.heartbeat_interval > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for connections in list(self.connections.values()):
+            for connection in list(connections):
+                await self.close(connection, HEARTBEAT_CLOSE_CODE)
+
+    def connect(self, user_id: str, websocket: WebSocket) -> Connection:
+        connection = Connection(user_id, websocket, self.queue_size)
+        connection.sender_task = asyncio.create_task(self._drain(connection))
+        self.connections.setdefault(user_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connection.closed = True
+        if connection.sender_task and connection.sender_task is not asyncio.current_task():
+            connection.sender_task.cancel()
+        connections = self.connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                self.connections.pop(connection.user_id, None)
+
+    async def close(self, connection: Connection, code: int):
+        self.disconnect(connection)
+        await self._close_socket(connection, code)
+
+    async def _close_socket(self, connection: Connection, code: int):
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def touch(self, connection: Connection):
+        connection.last_seen = time.monotonic()
+
+    def send(self, user_id: str, payload: str):
+        for connection in list(self.connections.get(user_id, ())):
+            self.enqueue(connection, payload)
+
+    def enqueue(self, connection: Connection, payload: str):
+        if connection.closed:
+            return
+        try:
+            connection.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "drop":
+                logger.warning(f"Send queue full for user {connection.user_id}, dropping message")
+            else:
+                logger.warning(f"Send queue full for user {connection.user_id}, closing slow socket")
+                # Marked closed right away, so the rest of a burst doesn't schedule more closes
+                self.disconnect(connection)
+                asyncio.create_task(self._close_socket(connection, SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _drain(self, connection: Connection):
+        try:
+            while True:
+                payload = await connection.queue.get()
+                await connection.websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Socket for user {connection.user_id} failed, removing it: {e}")
+            self.disconnect(connection)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            deadline = time.monotonic() - self.heartbeat_timeout
+            for connections in list(self.connections.values()):
+                for connection in list(connections):
+                    if connection.last_seen < deadline:
+                        logger.info(f"Evicting unresponsive socket for user {connection.user_id}")
+                        await self.close(connection, HEARTBEAT_CLOSE_CODE)
+                    else:
+                        self.enqueue(connection, PING_FRAME)
+
+
+connection_manager = ConnectionManager(
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    overflow_policy=settings.WS_OVERFLOW_POLICY,
+    heartbeat_interval=settings.WS_HEARTBEAT_INTERVAL_SECONDS,
+    heartbeat_timeout=settings.WS_HEARTBEAT_TIMEOUT_SECONDS,
+)
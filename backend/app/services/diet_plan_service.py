@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from uuid import UUID
+
+from sqlalchemy import func, select, true, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.diet_plan import DietPlan
+from app.models.meal import Meal
+from app.utils.pagination import encode_cursor
+
+
+class DietPlanService:
+    def list_plans(
+        self,
+        db: Session,
+        owner,
+        view: str = "full",
+        is_active: bool | None = None,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        before: tuple[datetime, UUID] | None = None,
+        limit: int | None = None,
+    ) -> list:
+        # Newest first. "summary" returns plan headers with meal figures from one aggregate
+        # query; "full" loads meals and items with one extra query per level instead of a
+        # plans x meals x items join.
+        if view == "summary":
+            stats = (
+                select(
+                    func.count(Meal.id).label("meal_count"),
+                    func.coalesce(func.sum(Meal.calories), 0).label("total_calories"),
+                )
+                .where(Meal.diet_plan_id == DietPlan.id)
+                .lateral()
+            )
+            query = db.query(
+                DietPlan.id,
+                DietPlan.dietitian_id,
+                DietPlan.client_id,
+                DietPlan.title,
+                DietPlan.description,
+                DietPlan.start_date,
+                DietPlan.end_date,
+                DietPlan.is_active,
+                DietPlan.created_at,
+                stats.c.meal_count,
+                stats.c.total_calories,
+            ).join(stats, true())
+        else:
+            query = db.query(DietPlan).options(selectinload(DietPlan.meals).selectinload(Meal.items))
+
+        query = query.filter(owner)
+        if is_active is not None:
+            query = query.filter(DietPlan.is_active == is_active)
+        # Plans running at any point between from_date and to_date
+        if from_date is not None:
+            query = query.filter(DietPlan.end_date >= from_date)
+        if to_date is not None:
+            query = query.filter(DietPlan.start_date <= to_date)
+        if before:
+            query = query.filter(tuple_(DietPlan.created_at, DietPlan.id) < tuple_(*before))
+        query = query.order_by(DietPlan.created_at.desc(), DietPlan.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def list_page(self, db: Session, owner, view: str, is_active, from_date, to_date, before, limit):
+        # Returns (plans, next_cursor). Without a limit every matching plan is returned,
+        # as before pagination was added.
+        plans = self.list_plans(db, owner, view, is_active, from_date, to_date, before, limit + 1 if limit else None)
+        if limit and len(plans) > limit:
+            plans = plans[:limit]
+            return plans, encode_cursor(plans[-1].created_at, plans[-1].id)
+        return plans, None
+
+
+diet_plan_service = DietPlanService()
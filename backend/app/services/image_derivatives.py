@@ -0,0 +1,90 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.utils.uploads import DERIVATIVE_SIZES, UPLOADS_TMP_DIR, derivative_filename
+
+logger = logging.getLogger(__name__)
+
+
+def generate_derivatives(path: str) -> list[str]:
+    # Runs in a worker process. Re-encoding without the original metadata strips EXIF;
+    # orientation is applied to the pixels first so rotated photos stay upright.
+    directory, filename = os.path.split(path)
+    written = []
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        for kind, size in DERIVATIVE_SIZES.items():
+            target = os.path.join(directory, derivative_filename(filename, kind))
+            if os.path.exists(target):
+                continue
+            derivative = image.copy()
+            derivative.thumbnail((size, size))
+            fd, tmp_target = tempfile.mkstemp(dir=UPLOADS_TMP_DIR, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    derivative.save(tmp, format="WEBP", quality=settings.IMAGE_DERIVATIVE_QUALITY)
+                os.replace(tmp_target, target)
+            finally:
+                if os.path.exists(tmp_target):
+                    os.remove(tmp_target)
+            written.append(target)
+    return written
+
+
+class ImageDerivativeService:
+    def __init__(self):
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app does not spawn worker processes. Workers are
+        # spawned rather than forked: a fork would copy the event loop, DB pool and locks held by
+        # other threads at that moment.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def is_complete(self, path: str) -> bool:
+        directory, filename = os.path.split(path)
+        return all(
+            os.path.exists(os.path.join(directory, derivative_filename(filename, kind))) for kind in DERIVATIVE_SIZES
+        )
+
+    def schedule(self, path: str, on_ready: Callable[[str], None]):
+        # on_ready(path) runs once every derivative is on disk; failed jobs leave it uncalled
+        future = self.pool.submit(generate_derivatives, path)
+        future.add_done_callback(lambda f: self._on_done(path, f, on_ready))
+
+    def _on_done(self, path: str, future: Future, on_ready: Callable[[str], None]):
+        try:
+            written = future.result()
+            if written:
+                logger.info(f"Generated {len(written)} derivatives for {path}")
+        except Exception as e:
+            logger.error(f"Failed to generate derivatives for {path}: {e}")
+            return
+        try:
+            on_ready(path)
+        except Exception as e:
+            logger.error(f"Failed to record derivatives for {path}: {e}")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+image_derivative_service = ImageDerivativeService()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+from uuid import UUID
+
+import anyio
+import psycopg
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.message import Message
+from app.schemas.message import MessageResponse
+
+logger = logging.getLogger(__name__)
+
+DeliverCallback = Callable[[str, str], Awaitable[None]]
+
+# NOTIFY payloads are capped at 8000 bytes; larger messages are sent by id and re-read by the listener
+MAX_NOTIFY_PAYLOAD = 7900
+RECONNECT_DELAY_SECONDS = 2
+
+
+class MessageBroker(ABC):
+    def __init__(self):
+        self._deliver: DeliverCallback | None = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: str, message: MessageResponse):
+        ...
+
+
+class InMemoryBroker(MessageBroker):
+    # Single-process default: delivers straight to this worker's sockets
+    async def publish(self, user_id: str, message: MessageResponse):
+        if self._deliver:
+            await self._deliver(user_id, message.model_dump_json())
+
+
+class PostgresBroker(MessageBroker):
+    # Fans messages out to every worker through LISTEN/NOTIFY on the application database
+    CHANNEL = "chat_messages"
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._publish_conn: psycopg.AsyncConnection | None = None
+        self._connect_lock = asyncio.Lock()
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._publish_conn:
+            await self._publish_conn.close()
+            self._publish_conn = None
+
+    async def publish(self, user_id: str, message: MessageResponse):
+        envelope = json.dumps({"user_id": user_id, "message": message.model_dump_json()})
+        if len(envelope.encode("utf-8")) > MAX_NOTIFY_PAYLOAD:
+            envelope = json.dumps({"user_id": user_id, "message_id": str(message.id)})
+
+        conn = await self._connection()
+        await conn.execute("SELECT pg_notify(%s, %s)", (self.CHANNEL, envelope))
+
+    async def _connection(self) -> psycopg.AsyncConnection:
+        # Publishers racing on the first message share one connection instead of each opening one
+        async with self._connect_lock:
+            if self._publish_conn is None or self._publish_conn.closed:
+                self._publish_conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+            return self._publish_conn
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.CHANNEL}")
+                    logger.info("Listening for chat messages on channel %s", self.CHANNEL)
+                    async for notify in conn.notifies():
+                        await self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat broker listener failed, reconnecting: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _dispatch(self, raw: str):
+        try:
+            envelope = json.loads(raw)
+            payload = envelope.get("message")
+            if payload is None:
+                payload = await anyio.to_thread.run_sync(_load_message_json, UUID(envelope["message_id"]))
+            if payload is not None and self._deliver:
+                await self._deliver(envelope["user_id"], payload)
+        except Exception as e:
+            logger.error(f"Failed to dispatch chat message: {e}")
+
+
+def _load_message_json(message_id: UUID) -> str | None:
+    db = SessionLocal()
+    try:
+        message = db.query(Message).filter(Message.id == message_id).first()
+        return MessageResponse.model_validate(message).model_dump_json() if message else None
+    finally:
+        db.close()
+
+
+def create_message_broker() -> MessageBroker:
+    if settings.CHAT_BROKER == "postgres":
+        # psycopg takes a plain libpq URL, without the SQLAlchemy driver suffix
+        dsn = settings.DATABASE_URL.replace("postgresql+psycopg://", "postgresql://", 1)
+        return PostgresBroker(dsn)
+    return InMemoryBroker()
+
+
+message_broker = create_message_broker()
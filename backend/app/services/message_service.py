@@ -0,0 +1,174 @@
+import uuid
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, case, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
+from sqlalchemy.orm import Session
+
+from app.models.conversation import Conversation, ConversationRead
+from app.models.message import Message
+from app.models.upload import ImageUpload
+
+PREVIEW_LENGTH = 255
+IMAGE_PREVIEW = "[Fotoğraf]"
+
+
+def conversation_pair(user_id: UUID, other_id: UUID) -> tuple[UUID, UUID]:
+    return (user_id, other_id) if user_id <= other_id else (other_id, user_id)
+
+
+class MessageService:
+    def create_message(
+        self,
+        db: Session,
+        sender_id: UUID,
+        receiver_id: UUID,
+        content: str | None,
+        image_url: str | None,
+    ) -> Message:
+        derivatives_ready = False
+        if image_url:
+            # FOR SHARE makes a finishing derivative job wait for this message, so the job's
+            # update of the messages sharing the image sees it
+            derivatives_ready = bool(
+                db.query(ImageUpload.derivatives_ready)
+                .filter(ImageUpload.image_url == image_url)
+                .with_for_update(read=True)
+                .scalar()
+            )
+        message = Message(
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            content=content,
+            image_url=image_url,
+            derivatives_ready=derivatives_ready,
+        )
+        db.add(message)
+        db.flush()
+        self._update_conversation(db, message)
+        db.commit()
+        db.refresh(message)
+        return message
+
+    def mark_conversation_read(self, db: Session, reader_id: UUID, peer_id: UUID) -> datetime | None:
+        # Advance the reader's watermark to the newest message from the peer in a single upsert
+        newest = func.max(Message.created_at)
+        latest = (
+            select(literal(reader_id, PG_UUID(as_uuid=True)), literal(peer_id, PG_UUID(as_uuid=True)), newest)
+            .where(Message.sender_id == peer_id, Message.receiver_id == reader_id)
+            .having(newest.is_not(None))
+        )
+        stmt = insert(ConversationRead).from_select(["user_id", "peer_id", "last_read_message_at"], latest)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "peer_id"],
+            set_={
+                "last_read_message_at": func.greatest(
+                    ConversationRead.last_read_message_at, stmt.excluded.last_read_message_at
+                )
+            },
+        ).returning(ConversationRead.last_read_message_at)
+        watermark = db.execute(stmt).scalar_one_or_none()
+        if watermark is None:
+            db.commit()
+            return None
+
+        # Messages that arrived after the watermark stay unread; counted through the conversation index
+        remaining = (
+            select(func.count(Message.id))
+            .where(
+                Message.sender_id == peer_id,
+                Message.receiver_id == reader_id,
+                Message.created_at > watermark,
+            )
+            .scalar_subquery()
+        )
+        user_a, user_b = conversation_pair(reader_id, peer_id)
+        unread_column = "unread_count_a" if reader_id == user_a else "unread_count_b"
+        db.query(Conversation).filter(
+            Conversation.user_a_id == user_a, Conversation.user_b_id == user_b
+        ).update({unread_column: remaining}, synchronize_session=False)
+        db.commit()
+        return watermark
+
+    def read_flags(self, db: Session, viewer_id: UUID, messages: list[Message]) -> list[bool]:
+        # is_read for each message as seen by viewer_id, derived from the receivers' watermarks
+        peer_ids = {m.receiver_id if m.sender_id == viewer_id else m.sender_id for m in messages}
+        if not peer_ids:
+            return []
+        reads = db.query(ConversationRead).filter(
+            or_(
+                and_(ConversationRead.user_id == viewer_id, ConversationRead.peer_id.in_(peer_ids)),
+                and_(ConversationRead.peer_id == viewer_id, ConversationRead.user_id.in_(peer_ids)),
+            )
+        ).all()
+        watermarks = {(r.user_id, r.peer_id): r.last_read_message_at for r in reads}
+
+        flags = []
+        for message in messages:
+            watermark = watermarks.get((message.receiver_id, message.sender_id))
+            flags.append(watermark is not None and message.created_at <= watermark)
+        return flags
+
+    def unread_count(self, db: Session, user_id: UUID) -> int:
+        unread = case(
+            (Conversation.user_a_id == user_id, Conversation.unread_count_a), else_=Conversation.unread_count_b
+        )
+        total = (
+            db.query(func.sum(unread))
+            .filter(or_(Conversation.user_a_id == user_id, Conversation.user_b_id == user_id))
+            .scalar()
+        )
+        return total or 0
+
+    def record_upload(self, db: Session, image_url: str, derivatives_ready: bool):
+        # A re-sent photo maps to the row already there, which only ever moves to ready
+        stmt = insert(ImageUpload).values(image_url=image_url, derivatives_ready=derivatives_ready)
+        if derivatives_ready:
+            stmt = stmt.on_conflict_do_update(index_elements=["image_url"], set_={"derivatives_ready": True})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["image_url"])
+        db.execute(stmt)
+        db.commit()
+
+    def mark_derivatives_ready(self, db: Session, image_url: str):
+        # The upload row first: it waits on messages being sent with this image (see create_message)
+        db.query(ImageUpload).filter(ImageUpload.image_url == image_url).update({"derivatives_ready": True})
+        db.query(Message).filter(Message.image_url == image_url, Message.derivatives_ready == False).update(
+            {"derivatives_ready": True}, synchronize_session=False
+        )
+        db.commit()
+
+    def _update_conversation(self, db: Session, message: Message):
+        user_a, user_b = conversation_pair(message.sender_id, message.receiver_id)
+        receiver_is_a = message.receiver_id == user_a
+        preview = (message.content or IMAGE_PREVIEW)[:PREVIEW_LENGTH]
+
+        stmt = insert(Conversation).values(
+            id=uuid.uuid4(),
+            user_a_id=user_a,
+            user_b_id=user_b,
+            last_message_id=message.id,
+            last_message_preview=preview,
+            last_message_at=message.created_at,
+            unread_count_a=1 if receiver_is_a else 0,
+            unread_count_b=0 if receiver_is_a else 1,
+        )
+        # Concurrent sends may commit out of order, so only move the "last message" forward.
+        is_newer = stmt.excluded.last_message_at >= Conversation.last_message_at
+        unread_column = Conversation.unread_count_a if receiver_is_a else Conversation.unread_count_b
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_conversations_pair",
+            set_={
+                "last_message_id": case((is_newer, stmt.excluded.last_message_id), else_=Conversation.last_message_id),
+                "last_message_preview": case(
+                    (is_newer, stmt.excluded.last_message_preview), else_=Conversation.last_message_preview
+                ),
+                "last_message_at": case((is_newer, stmt.excluded.last_message_at), else_=Conversation.last_message_at),
+                unread_column.key: unread_column + 1,
+            },
+        )
+        db.execute(stmt)
+
+
+message_service = MessageService()
@@ -1,15 +1,22 @@
 import os
 import logging
-from uuid import UUID
+import uuid
 from datetime import datetime
+from uuid import UUID
+from sqlalchemy import Integer, String, Text, and_, any_, func, insert, literal, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.orm import Session
 from simple_apns import APNSClient, Payload
 
-from app.models.notification import Notification
-from app.models.user import User
+from app.models.device_token import DeviceToken
+from app.models.diet_plan import DietPlan
+from app.models.notification import Broadcast, BroadcastReceipt, Notification
+from app.models.push import PushJob, PushOutbox
+from app.models.user import DietitianClient, User
 
 logger = logging.getLogger(__name__)
 
+
 class NotificationService:
     def __init__(self):
         self.team_id = os.getenv("APNS_TEAM_ID")
@@ -17,7 +24,7 @@ class NotificationService:
         self.bundle_id = os.getenv("APNS_BUNDLE_ID", "com.dietapp.ios")
         self.auth_key_path = os.getenv("APNS_AUTH_KEY_PATH", "cert/apns_key.p8")
         self.use_sandbox = os.getenv("APNS_USE_SANDBOX", "true").lower() == "true"
-        
+
         self.client = None
         if all([self.team_id, self.key_id, os.path.exists(self.auth_key_path)]):
             try:
@@ -26,7 +33,9 @@ class NotificationService:
                     auth_key_id=self.key_id,
                     auth_key_path=self.auth_key_path,
                     bundle_id=self.bundle_id,
-                    use_sandbox=self.use_sandbox
+                    use_sandbox=self.use_sandbox,
+                    # The push worker retries with backoff; don't block a sender thread retrying inline
+                    max_retries=0,
                 )
             except Exception as e:
                 logger.error(f"Failed to initialize APNs client: {e}")
@@ -34,38 +43,300 @@ class NotificationService:
             logger.warning("APNs credentials missing or .p8 file not found. Running in MOCK mode.")
 
     def send_push_notification(self, db: Session, user: User, title: str, content: str):
-        # 1. Save to Database
+        # The notification and a push per device are committed together; the push worker delivers them
+        now = datetime.utcnow()
         notification = Notification(
+            id=uuid.uuid4(),
             user_id=user.id,
             title=title,
             content=content,
-            created_at=datetime.utcnow()
+            created_at=now
         )
         db.add(notification)
+        db.flush()
+        self._adjust_unread(db, user, 1)
+        devices = select(DeviceToken.user_id, DeviceToken.token).where(DeviceToken.user_id == user.id)
+        self._queue_pushes(db, devices, title, content, now, notification_id=notification.id)
         db.commit()
         db.refresh(notification)
+        return notification
+
+    def has_devices(self, db: Session, user_id: UUID) -> bool:
+        return db.query(select(DeviceToken.id).where(DeviceToken.user_id == user_id).exists()).scalar()
+
+    def register_device(self, db: Session, user_id: UUID, token: str):
+        # A token belongs to one device; if another account registered it before, it moves over
+        now = datetime.utcnow()
+        stmt = pg_insert(DeviceToken).values(
+            id=uuid.uuid4(), user_id=user_id, token=token, created_at=now, last_seen_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["token"], set_={"user_id": user_id, "last_seen_at": now}
+        ))
+        db.commit()
+
+    def unregister_device(self, db: Session, user_id: UUID, token: str) -> bool:
+        removed = db.query(DeviceToken).filter(DeviceToken.user_id == user_id, DeviceToken.token == token).delete()
+        db.commit()
+        return bool(removed)
+
+    def deliver(self, apns_token: str, title: str, content: str):
+        # Raises APNSException on failure; called from the push worker
+        if self.client:
+            payload = Payload(alert_title=title, alert_body=content)
+            self.client.send_notification(apns_token, payload)
+        else:
+            logger.info(f"[MOCK PUSH] To: {apns_token}, Title: {title}, Content: {content}")
+
+    def send_bulk_push(self, db: Session, title: str, content: str) -> PushJob:
+        # The broadcast is stored once; only the pushes are per client, one outbox row per device token
+        now = datetime.utcnow()
+        job = PushJob(id=uuid.uuid4(), title=title, created_at=now)
+        job.notifications = db.query(User).filter(User.role == "client").update(
+            {User.unread_notification_count: User.unread_notification_count + 1},
+            synchronize_session=False,
+        )
+        db.add_all([Broadcast(title=title, content=content, created_at=now), job])
+        db.flush()
+
+        devices = (
+            select(DeviceToken.user_id, DeviceToken.token)
+            .join(User, User.id == DeviceToken.user_id)
+            .where(User.role == "client")
+        )
+        queued = self._queue_pushes(db, devices, title, content, now, job_id=job.id)
+        db.commit()
+        logger.info(f"Bulk job {job.id}: {job.notifications} recipients, {queued} pushes queued")
+        return job
+
+    def audience(
+        self,
+        dietitian_id: UUID,
+        target_type: str,
+        client_ids: list[UUID] | None = None,
+        timezones: list[str] | None = None,
+    ):
+        # Ids of the dietitian's active clients the target covers, as one select (column user_id),
+        # optionally narrowed to the clients living in `timezones`
+        query = select(DietitianClient.client_id.label("user_id")).where(
+            DietitianClient.dietitian_id == dietitian_id,
+            DietitianClient.status == "active",
+        )
+        if timezones is not None:
+            query = query.join(User, User.id == DietitianClient.client_id).where(User.timezone.in_(timezones))
+        if target_type == "clients":
+            query = query.where(DietitianClient.client_id.in_(client_ids or []))
+        elif target_type == "active_plan":
+            today = datetime.utcnow().date()
+            query = query.where(
+                select(DietPlan.id)
+                .where(
+                    DietPlan.dietitian_id == dietitian_id,
+                    DietPlan.client_id == DietitianClient.client_id,
+                    DietPlan.is_active == True,
+                    DietPlan.start_date <= today,
+                    DietPlan.end_date >= today,
+                )
+                .exists()
+            )
+        return query.distinct()
+
+    def audience_timezones(self, db: Session, audience) -> list[str]:
+        recipients = audience.subquery()
+        return db.execute(
+            select(User.timezone).where(User.id.in_(select(recipients.c.user_id))).distinct()
+        ).scalars().all()
 
-        # 2. Send Push if token exists
-        if user.apns_token:
-            if self.client:
-                try:
-                    payload = Payload(alert_title=title, alert_body=content)
-                    self.client.send_notification(user.apns_token, payload)
-                    logger.info(f"Push notification sent to user {user.id} ({user.full_name})")
-                except Exception as e:
-                    logger.error(f"Failed to send push notification to user {user.id}: {e}")
+    def send_to_audience(self, db: Session, audience, title: str, content: str) -> PushJob:
+        # Stored once like a bulk broadcast; the audience query runs once and only decides who
+        # gets a receipt, which makes the broadcast visible to them, and a push per device
+        now = datetime.utcnow()
+        recipients = db.execute(audience).scalars().all()
+        job = PushJob(id=uuid.uuid4(), title=title, notifications=len(recipients), created_at=now)
+        db.add(job)
+
+        if recipients:
+            broadcast = Broadcast(id=uuid.uuid4(), title=title, content=content, targeted=True, created_at=now)
+            db.add(broadcast)
+            db.flush()
+            user_ids = literal(recipients, ARRAY(PG_UUID(as_uuid=True)))
+            db.execute(
+                insert(BroadcastReceipt).from_select(
+                    ["broadcast_id", "user_id"],
+                    select(literal(broadcast.id, PG_UUID(as_uuid=True)), func.unnest(user_ids)),
+                )
+            )
+            db.query(User).filter(User.id == any_(user_ids)).update(
+                {User.unread_notification_count: User.unread_notification_count + 1},
+                synchronize_session=False,
+            )
+            devices = select(DeviceToken.user_id, DeviceToken.token).where(DeviceToken.user_id == any_(user_ids))
+            queued = self._queue_pushes(db, devices, title, content, now, job_id=job.id)
+        else:
+            queued = 0
+        db.commit()
+        logger.info(f"Targeted job {job.id}: {job.notifications} recipients, {queued} pushes queued")
+        return job
+
+    def _queue_pushes(
+        self,
+        db: Session,
+        devices,
+        title: str,
+        content: str,
+        now: datetime,
+        job_id: UUID | None = None,
+        notification_id: UUID | None = None,
+    ) -> int:
+        # One outbox row per (user_id, token) row selected by `devices`, in a single INSERT ... SELECT
+        devices = devices.subquery()
+        pushes = select(
+            func.gen_random_uuid(),
+            literal(job_id, PG_UUID(as_uuid=True)),
+            literal(notification_id, PG_UUID(as_uuid=True)),
+            devices.c.user_id,
+            devices.c.token,
+            literal(title, String),
+            literal(content, Text),
+            literal("pending", String),
+            literal(0, Integer),
+            literal(now),
+            literal(now),
+        )
+        queued = (
+            insert(PushOutbox)
+            .from_select(
+                [
+                    "id", "job_id", "notification_id", "user_id", "apns_token", "title", "content",
+                    "status", "attempts", "next_attempt_at", "created_at",
+                ],
+                pushes,
+            )
+            .returning(PushOutbox.id)
+            .cte("queued")
+        )
+        return db.execute(select(func.count()).select_from(queued)).scalar_one()
+
+    def feed(self, user: User, before: tuple[datetime, UUID] | None = None, limit: int | None = None):
+        # Personal notifications and the broadcasts the user received, newest first. Each side is
+        # paged on its own index before merging, so a page costs at most 2 * limit rows. A limit of
+        # None returns everything.
+        personal = select(
+            Notification.id,
+            Notification.user_id,
+            Notification.title,
+            Notification.content,
+            Notification.is_read,
+            Notification.created_at,
+            literal("personal", String).label("kind"),
+        ).where(Notification.user_id == user.id)
+        parts = [self._page(personal, Notification, before, limit)]
+
+        if user.role == "client":
+            is_read = BroadcastReceipt.read_at.is_not(None)
+            if user.broadcasts_read_at is not None:
+                is_read = or_(is_read, Broadcast.created_at <= user.broadcasts_read_at)
+            broadcasts = select(
+                Broadcast.id,
+                literal(user.id, PG_UUID(as_uuid=True)),
+                Broadcast.title,
+                Broadcast.content,
+                is_read,
+                Broadcast.created_at,
+                literal("broadcast", String),
+            )
+            receipt = and_(BroadcastReceipt.broadcast_id == Broadcast.id, BroadcastReceipt.user_id == user.id)
+            # Untargeted broadcasts since the user signed up, and the targeted ones they hold a receipt for
+            untargeted = broadcasts.outerjoin(BroadcastReceipt, receipt).where(
+                Broadcast.targeted == False, Broadcast.created_at >= user.created_at
+            )
+            targeted = broadcasts.join(BroadcastReceipt, receipt).where(Broadcast.targeted == True)
+            parts.append(self._page(untargeted, Broadcast, before, limit))
+            parts.append(self._page(targeted, Broadcast, before, limit))
+
+        feed = union_all(*parts).subquery()
+        return select(feed).order_by(feed.c.created_at.desc(), feed.c.id.desc()).limit(limit)
+
+    def _page(self, query, model, before: tuple[datetime, UUID] | None, limit: int | None):
+        if before:
+            query = query.where(tuple_(model.created_at, model.id) < tuple_(*before))
+        return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+    def mark_read(self, db: Session, user: User, notification_id: UUID) -> bool:
+        personal = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == user.id)
+        if personal.filter(Notification.is_read == False).update({"is_read": True}):
+            self._adjust_unread(db, user, -1)
+        elif not db.query(personal.exists()).scalar():
+            if user.role != "client":
+                return False
+            broadcast = (
+                db.query(Broadcast.targeted, Broadcast.created_at)
+                .filter(Broadcast.id == notification_id, Broadcast.created_at >= user.created_at)
+                .first()
+            )
+            if not broadcast:
+                return False
+            now = datetime.utcnow()
+            if broadcast.targeted:
+                receipt = db.query(BroadcastReceipt).filter(
+                    BroadcastReceipt.broadcast_id == notification_id, BroadcastReceipt.user_id == user.id
+                )
+                if not db.query(receipt.exists()).scalar():
+                    return False
+                marked = receipt.filter(BroadcastReceipt.read_at.is_(None)).update({"read_at": now})
             else:
-                logger.info(f"[MOCK PUSH] To: {user.full_name}, Title: {title}, Content: {content}")
-        
-        return notification
+                marked = db.execute(
+                    pg_insert(BroadcastReceipt)
+                    .values(broadcast_id=notification_id, user_id=user.id, read_at=now)
+                    .on_conflict_do_nothing()
+                ).rowcount
+            # Broadcasts behind the read-all watermark already left the counter
+            if marked and (user.broadcasts_read_at is None or broadcast.created_at > user.broadcasts_read_at):
+                self._adjust_unread(db, user, -1)
+        db.commit()
+        return True
+
+    def mark_all_read(self, db: Session, user: User):
+        db.query(Notification).filter(
+            Notification.user_id == user.id,
+            Notification.is_read == False
+        ).update({"is_read": True})
+        if user.role == "client":
+            user.broadcasts_read_at = datetime.utcnow()
+        user.unread_notification_count = 0
+        db.commit()
+
+    def unread_count(self, db: Session, user: User) -> int:
+        # Kept in step on every send, read and retention delete, for broadcasts too
+        return user.unread_notification_count
 
-    def send_bulk_push(self, db: Session, title: str, content: str):
-        # Send to all client users (save to DB + push if token exists)
-        users = db.query(User).filter(User.role == "client").all()
-        results = []
-        for user in users:
-            notif = self.send_push_notification(db, user, title, content)
-            results.append(notif)
-        return results
+    def _adjust_unread(self, db: Session, user: User, delta: int):
+        db.query(User).filter(User.id == user.id).update(
+            {User.unread_notification_count: func.greatest(User.unread_notification_count + delta, 0)},
+            synchronize_session=False,
+        )
+
+    def job_progress(self, db: Session, job_id: UUID) -> dict | None:
+        job = db.query(PushJob).filter(PushJob.id == job_id).first()
+        if not job:
+            return None
+        counts = dict(
+            db.query(PushOutbox.status, func.count())
+            .filter(PushOutbox.job_id == job_id)
+            .group_by(PushOutbox.status)
+            .all()
+        )
+        pending = counts.get("pending", 0)
+        return {
+            "job_id": job.id,
+            "title": job.title,
+            "status": "running" if pending else "completed",
+            "notifications": job.notifications,
+            "pushes_total": sum(counts.values()),
+            "pushes_sent": counts.get("sent", 0),
+            "pushes_failed": counts.get("failed", 0),
+            "pushes_pending": pending,
+            "created_at": job.created_at,
+        }
 
 notification_service = NotificationService()
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from uuid import UUID
+
+from app.config import settings
+from app.utils.lru import ExpiringLRU
+
+
+# What authentication needs to know about a user; routers that need more load the User row.
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: UUID
+    role: str
+    full_name: str
+
+
+class PrincipalCache:
+    # Bounded LRU of principals by user id. Entries expire after ttl_seconds, so changes made
+    # by another worker show up within that window; local changes invalidate straight away.
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries = ExpiringLRU(max_size)
+
+    def get(self, user_id: UUID) -> Principal | None:
+        return self._entries.get(user_id)
+
+    def put(self, principal: Principal):
+        self._entries.put(principal.id, principal, self.ttl_seconds)
+
+    def invalidate(self, user_id: UUID):
+        self._entries.pop(user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "ttl_seconds": self.ttl_seconds}
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
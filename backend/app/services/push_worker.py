@@ -0,0 +1,177 @@
+"""Delivers queued pushes from the push_outbox table.
+
+    python -m app.services.push_worker
+
+Any number of workers can run side by side; rows are claimed with FOR UPDATE SKIP LOCKED
+and a lease, so each push is handled by one worker at a time.
+"""
+import logging
+import random
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from simple_apns import APNSTokenError
+from sqlalchemy import insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device_token import DeviceToken
+from app.models.push import PushAttempt, PushOutbox
+from app.services.notification_service import notification_service
+
+logger = logging.getLogger(__name__)
+
+
+class PushWorker:
+    def __init__(
+        self,
+        batch_size: int,
+        lease_seconds: int,
+        poll_interval: float,
+        max_attempts: int,
+        retry_base_seconds: float,
+        concurrency: int,
+    ):
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.sender = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="apns")
+        self.running = False
+
+    def run(self):
+        self.running = True
+        logger.info("Push worker started.")
+        while self.running:
+            try:
+                claimed = self.process_batch()
+            except Exception as e:
+                logger.error(f"Error processing push batch: {e}")
+                claimed = 0
+            # A full batch means more is probably waiting
+            if claimed < self.batch_size:
+                time.sleep(self.poll_interval)
+        self.sender.shutdown(wait=True)
+        logger.info("Push worker stopped.")
+
+    def stop(self, *args):
+        self.running = False
+
+    def process_batch(self) -> int:
+        db = SessionLocal()
+        try:
+            rows = self._claim(db)
+            if rows:
+                results = list(self.sender.map(self._send, rows))
+                self._record(db, rows, results)
+            return len(rows)
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> list:
+        now = datetime.utcnow()
+        due = (
+            select(PushOutbox.id)
+            .where(
+                PushOutbox.status == "pending",
+                PushOutbox.next_attempt_at <= now,
+                or_(PushOutbox.locked_until.is_(None), PushOutbox.locked_until < now),
+            )
+            .order_by(PushOutbox.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        # The attempt is counted when claimed, so a worker that dies mid-send still uses one up
+        stmt = (
+            update(PushOutbox)
+            .where(PushOutbox.id.in_(due.scalar_subquery()))
+            .values(locked_until=now + self.lease, attempts=PushOutbox.attempts + 1)
+            .returning(PushOutbox.id, PushOutbox.user_id, PushOutbox.apns_token, PushOutbox.title, PushOutbox.content, PushOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.execute(stmt).all()
+        db.commit()
+        return rows
+
+    def _send(self, row) -> tuple[str | None, bool]:
+        # Returns (error, permanent)
+        try:
+            notification_service.deliver(row.apns_token, row.title, row.content)
+            return None, False
+        except APNSTokenError as e:
+            return str(e), True
+        except Exception as e:
+            return str(e), False
+
+    def _record(self, db: Session, rows: list, results: list):
+        now = datetime.utcnow()
+        sent_ids = []
+        dead_tokens = set()
+        attempts = []
+        for row, (error, permanent) in zip(rows, results):
+            attempts.append({
+                "outbox_id": row.id,
+                "attempt": row.attempts,
+                "status": "sent" if error is None else "failed",
+                "error": error,
+                "created_at": now,
+            })
+            if error is None:
+                sent_ids.append(row.id)
+                continue
+
+            logger.warning(f"Push {row.id} attempt {row.attempts} failed: {error}")
+            values = {"locked_until": None, "last_error": error}
+            if permanent:
+                values["status"] = "failed"
+                dead_tokens.add((row.user_id, row.apns_token))
+            elif row.attempts >= self.max_attempts:
+                values["status"] = "failed"
+            else:
+                values["next_attempt_at"] = now + self._backoff(row.attempts)
+            db.query(PushOutbox).filter(PushOutbox.id == row.id).update(values, synchronize_session=False)
+
+        if sent_ids:
+            db.query(PushOutbox).filter(PushOutbox.id.in_(sent_ids)).update(
+                {"status": "sent", "sent_at": now, "locked_until": None, "last_error": None},
+                synchronize_session=False,
+            )
+        if dead_tokens:
+            # APNs reported these as unregistered (410) or invalid; stop pushing to them. Matched on the
+            # owner too, so a token that has since moved to another account is left alone.
+            pruned = (
+                db.query(DeviceToken)
+                .filter(tuple_(DeviceToken.user_id, DeviceToken.token).in_(dead_tokens))
+                .delete(synchronize_session=False)
+            )
+            logger.info(f"Pruned {pruned} dead device tokens")
+        db.execute(insert(PushAttempt), attempts)
+        db.commit()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        # Exponential with jitter so a provider outage doesn't retry everything in lockstep
+        delay = self.retry_base_seconds * 2 ** (attempts - 1)
+        return timedelta(seconds=delay * random.uniform(0.75, 1.25))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = PushWorker(
+        batch_size=settings.PUSH_BATCH_SIZE,
+        lease_seconds=settings.PUSH_LEASE_SECONDS,
+        poll_interval=settings.PUSH_POLL_INTERVAL_SECONDS,
+        max_attempts=settings.PUSH_MAX_ATTEMPTS,
+        retry_base_seconds=settings.PUSH_RETRY_BASE_SECONDS,
+        concurrency=settings.APNS_SENDER_THREADS,
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
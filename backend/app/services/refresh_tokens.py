@@ -0,0 +1,197 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.refresh_token import RefreshTokenFamily
+from app.models.user import User
+from app.utils.auth import create_access_token, create_refresh_token
+
+logger = logging.getLogger(__name__)
+
+# Revocations are re-read with this much overlap, so one committed slightly out of
+# revoked_at order, or stamped by a worker with a skewed clock, is not missed
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class RevokedFamilies:
+    # Revoked session ids held in memory so every request can check its token without a query.
+    # Each worker applies its own revocations at once and pulls everyone else's from
+    # refresh_token_families every sync_seconds. Entries are dropped once the session's
+    # tokens would have expired anyway.
+
+    def __init__(self, sync_seconds: float):
+        self.sync_seconds = sync_seconds
+        self.revoked: dict[str, datetime] = {}
+        self.synced_at: datetime | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __contains__(self, family_id: str | None) -> bool:
+        return family_id is not None and family_id in self.revoked
+
+    def add(self, family_id: UUID, expires_at: datetime):
+        with self._lock:
+            self.revoked[str(family_id)] = expires_at
+
+    def sync(self):
+        started = datetime.utcnow()
+        if self.synced_at is None:
+            since = started - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        else:
+            since = self.synced_at - SYNC_OVERLAP
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(RefreshTokenFamily.id, RefreshTokenFamily.expires_at)
+                .filter(RefreshTokenFamily.revoked_at > since, RefreshTokenFamily.expires_at > started)
+                .all()
+            )
+        finally:
+            db.close()
+        with self._lock:
+            revoked = {family_id: expires_at for family_id, expires_at in self.revoked.items() if expires_at > started}
+            revoked.update((str(family_id), expires_at) for family_id, expires_at in rows)
+            self.revoked = revoked
+        self.synced_at = started
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Error syncing revoked sessions: {e}")
+            self._stopping.wait(self.sync_seconds)
+
+
+class RefreshTokenService:
+    def __init__(self, revoked: RevokedFamilies):
+        self.revoked = revoked
+
+    def issue(self, db: Session, user_id: UUID, role: str) -> tuple[str, str]:
+        # Starts a new login session; returns (access_token, refresh_token)
+        expires_at = self._expiry()
+        family = RefreshTokenFamily(id=uuid.uuid4(), user_id=user_id, current_jti=uuid.uuid4(), expires_at=expires_at)
+        db.add(family)
+        db.commit()
+        return self._pair(user_id, role, family.id, family.current_jti, expires_at)
+
+    def rotate(self, db: Session, payload: dict) -> tuple[str, str] | None:
+        # Swaps a refresh token for a new pair; None if the token is no longer accepted
+        try:
+            family_id, jti, user_id = UUID(payload["fam"]), UUID(payload["jti"]), UUID(payload["sub"])
+        except (KeyError, ValueError):
+            return None
+        if str(family_id) in self.revoked:
+            return None
+
+        now = datetime.utcnow()
+        new_jti = uuid.uuid4()
+        expires_at = self._expiry()
+        rotated = (
+            db.query(RefreshTokenFamily)
+            .filter(
+                RefreshTokenFamily.id == family_id,
+                RefreshTokenFamily.current_jti == jti,
+                RefreshTokenFamily.revoked_at.is_(None),
+            )
+            .update(
+                {"current_jti": new_jti, "previous_jti": jti, "rotated_at": now, "expires_at": expires_at},
+                synchronize_session=False,
+            )
+        )
+        if not rotated:
+            # The token a concurrent refresh just replaced gets the pair that refresh produced
+            current = (
+                db.query(RefreshTokenFamily.current_jti, RefreshTokenFamily.expires_at)
+                .filter(
+                    RefreshTokenFamily.id == family_id,
+                    RefreshTokenFamily.previous_jti == jti,
+                    RefreshTokenFamily.revoked_at.is_(None),
+                    RefreshTokenFamily.rotated_at >= now - timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS),
+                )
+                .first()
+            )
+            if current is None:
+                # A validly signed token that is no longer current was used before, so a copy of it
+                # is around. Ending the session logs out both the owner and whoever holds the copy.
+                if self.revoke_family(db, family_id):
+                    logger.warning(f"Refresh token reuse in session {family_id}; session revoked")
+                return None
+            new_jti, expires_at = current
+
+        role = db.query(User.role).filter(User.id == user_id).scalar()
+        if role is None:
+            db.rollback()
+            return None
+        db.commit()
+        return self._pair(user_id, role, family_id, new_jti, expires_at)
+
+    def is_current(self, db: Session, payload: dict) -> bool:
+        # Whether the refresh token is the one its session would accept next
+        try:
+            family_id, jti, user_id = UUID(payload["fam"]), UUID(payload["jti"]), UUID(payload["sub"])
+        except (KeyError, ValueError):
+            return False
+        if str(family_id) in self.revoked:
+            return False
+        return db.query(
+            db.query(RefreshTokenFamily)
+            .filter(
+                RefreshTokenFamily.id == family_id,
+                RefreshTokenFamily.user_id == user_id,
+                RefreshTokenFamily.current_jti == jti,
+                RefreshTokenFamily.revoked_at.is_(None),
+            )
+            .exists()
+        ).scalar()
+
+    def revoke_family(self, db: Session, family_id: UUID) -> bool:
+        return bool(self._revoke(db, RefreshTokenFamily.id == family_id))
+
+    def revoke_user(self, db: Session, user_id: UUID) -> int:
+        return self._revoke(db, RefreshTokenFamily.user_id == user_id)
+
+    def _revoke(self, db: Session, condition) -> int:
+        revoked = db.execute(
+            update(RefreshTokenFamily)
+            .where(condition, RefreshTokenFamily.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+            .returning(RefreshTokenFamily.id, RefreshTokenFamily.expires_at)
+        ).all()
+        db.commit()
+        for family_id, expires_at in revoked:
+            self.revoked.add(family_id, expires_at)
+        return len(revoked)
+
+    def _expiry(self) -> datetime:
+        return datetime.utcnow().replace(microsecond=0) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    def _pair(self, user_id: UUID, role: str, family_id: UUID, jti: UUID, expires_at: datetime) -> tuple[str, str]:
+        return (
+            create_access_token(user_id, role, family_id),
+            create_refresh_token(user_id, family_id, jti, expires_at),
+        )
+
+
+revoked_families = RevokedFamilies(settings.REVOCATION_SYNC_SECONDS)
+refresh_token_service = RefreshTokenService(revoked_families)
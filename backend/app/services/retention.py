@@ -0,0 +1,256 @@
+"""Deletes old notification, broadcast, push delivery and login session data in small batches.
+
+Runs periodically on the scheduler leader; for a one-off run:
+
+    python -m app.services.retention
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device_token import DeviceToken
+from app.models.notification import Broadcast, BroadcastReceipt, Notification
+from app.models.push import PushJob, PushOutbox
+from app.models.refresh_token import RefreshTokenFamily
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    # Every policy deletes in batches of batch_size walked in primary key order, committing
+    # after each batch so no lock is held for long. A limit of 0 turns a policy off.
+
+    def __init__(
+        self,
+        read_days: int,
+        max_per_user: int,
+        broadcast_days: int,
+        push_days: int,
+        device_days: int,
+        batch_size: int,
+    ):
+        self.read_days = read_days
+        self.max_per_user = max_per_user
+        self.broadcast_days = broadcast_days
+        self.push_days = push_days
+        self.device_days = device_days
+        self.batch_size = batch_size
+
+    def run(self) -> dict[str, int]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            reclaimed = {
+                "read_notifications": self._purge_read_notifications(db, now),
+                "notifications_over_limit": self._enforce_per_user_limit(db),
+                "broadcast_receipts": self._purge_covered_receipts(db),
+                "broadcasts": self._purge_expired_broadcasts(db, now),
+                "push_outbox": self._purge_push_outbox(db, now),
+                "push_jobs": self._purge_push_jobs(db, now),
+                "device_tokens": self._purge_stale_devices(db, now),
+                "refresh_token_families": self._purge_expired_sessions(db, now),
+            }
+        finally:
+            db.close()
+        logger.info(f"Retention run reclaimed {sum(reclaimed.values())} rows: {reclaimed}")
+        return reclaimed
+
+    def _purge_read_notifications(self, db: Session, now: datetime) -> int:
+        if not self.read_days:
+            return 0
+        cutoff = now - timedelta(days=self.read_days)
+        candidates = select(Notification.id).where(Notification.is_read == True, Notification.created_at < cutoff)
+        return self._delete_in_batches(db, Notification, candidates)
+
+    def _enforce_per_user_limit(self, db: Session) -> int:
+        # Keeps each user's newest max_per_user personal notifications
+        if not self.max_per_user:
+            return 0
+        over_limit = db.execute(
+            select(Notification.user_id).group_by(Notification.user_id).having(func.count() > self.max_per_user)
+        ).scalars().all()
+        total = 0
+        for user_id in over_limit:
+            oldest = (
+                select(Notification.id)
+                .where(Notification.user_id == user_id)
+                .order_by(Notification.created_at.desc(), Notification.id.desc())
+                .offset(self.max_per_user)
+            )
+            candidates = select(Notification.id).where(Notification.id.in_(oldest))
+            total += self._delete_in_batches(
+                db, Notification, candidates, [Notification.user_id, Notification.is_read], self._release_unread
+            )
+        return total
+
+    def _purge_covered_receipts(self, db: Session) -> int:
+        # Receipts at or before the user's read-all watermark no longer add anything. Receipts of
+        # targeted broadcasts are kept: they are what makes the broadcast visible to its recipients.
+        candidates = (
+            select(BroadcastReceipt.broadcast_id, BroadcastReceipt.user_id)
+            .join(Broadcast, Broadcast.id == BroadcastReceipt.broadcast_id)
+            .join(User, User.id == BroadcastReceipt.user_id)
+            .where(Broadcast.targeted == False, Broadcast.created_at <= User.broadcasts_read_at)
+        )
+        return self._delete_in_batches(db, BroadcastReceipt, candidates)
+
+    def _purge_expired_broadcasts(self, db: Session, now: datetime) -> int:
+        # Receipts of expired targeted broadcasts go first, each unread one leaving its owner's
+        # counter. The broadcasts follow, taking untargeted ones off the counters of the clients
+        # that never read them; their remaining read receipts go with them by cascade.
+        if not self.broadcast_days:
+            return 0
+        cutoff = now - timedelta(days=self.broadcast_days)
+        receipts = (
+            select(BroadcastReceipt.broadcast_id, BroadcastReceipt.user_id)
+            .join(Broadcast, Broadcast.id == BroadcastReceipt.broadcast_id)
+            .where(Broadcast.targeted == True, Broadcast.created_at < cutoff)
+        )
+        self._delete_in_batches(
+            db, BroadcastReceipt, receipts, [BroadcastReceipt.read_at], self._release_unread_receipts
+        )
+
+        expired = select(Broadcast.id).where(Broadcast.created_at < cutoff)
+        total = 0
+        last_id = None
+        while True:
+            batch = expired if last_id is None else expired.where(Broadcast.id > last_id)
+            ids = db.execute(batch.order_by(Broadcast.id).limit(self.batch_size)).scalars().all()
+            if ids:
+                self._release_unread_broadcasts(db, ids)
+                db.execute(delete(Broadcast).where(Broadcast.id.in_(ids)))
+                db.commit()
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                return total
+            last_id = ids[-1]
+
+    def _purge_push_outbox(self, db: Session, now: datetime) -> int:
+        # Finished deliveries; their push_attempts go with them
+        if not self.push_days:
+            return 0
+        cutoff = now - timedelta(days=self.push_days)
+        candidates = select(PushOutbox.id).where(PushOutbox.status != "pending", PushOutbox.created_at < cutoff)
+        return self._delete_in_batches(db, PushOutbox, candidates)
+
+    def _purge_push_jobs(self, db: Session, now: datetime) -> int:
+        if not self.push_days:
+            return 0
+        cutoff = now - timedelta(days=self.push_days)
+        candidates = select(PushJob.id).where(
+            PushJob.created_at < cutoff,
+            ~select(PushOutbox.id).where(PushOutbox.job_id == PushJob.id).exists(),
+        )
+        return self._delete_in_batches(db, PushJob, candidates)
+
+    def _purge_stale_devices(self, db: Session, now: datetime) -> int:
+        # Devices that haven't re-registered their token in a long time are most likely gone
+        if not self.device_days:
+            return 0
+        cutoff = now - timedelta(days=self.device_days)
+        candidates = select(DeviceToken.id).where(DeviceToken.last_seen_at < cutoff)
+        return self._delete_in_batches(db, DeviceToken, candidates)
+
+    def _purge_expired_sessions(self, db: Session, now: datetime) -> int:
+        # No token of an expired session verifies any more, revoked or not
+        candidates = select(RefreshTokenFamily.id).where(RefreshTokenFamily.expires_at < now)
+        return self._delete_in_batches(db, RefreshTokenFamily, candidates)
+
+    def _delete_in_batches(self, db: Session, model, candidates, returning=(), on_deleted=None) -> int:
+        # on_deleted gets the deleted rows (primary key, then `returning`) before each batch commits
+        keys = list(model.__table__.primary_key.columns)
+        returning = keys + list(returning)
+        total = 0
+        last_key = None
+        while True:
+            batch = candidates
+            if last_key is not None:
+                batch = batch.where(tuple_(*keys) > tuple_(*last_key))
+            batch = batch.order_by(*keys).limit(self.batch_size)
+            rows = db.execute(delete(model).where(tuple_(*keys).in_(batch)).returning(*returning)).all()
+            if on_deleted:
+                on_deleted(db, rows)
+            db.commit()
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                return total
+            last_key = max(tuple(row[:len(keys)]) for row in rows)
+
+    def _release_unread(self, db: Session, rows):
+        # Deleted unread notifications leave the user's unread counter
+        unread = {}
+        for row in rows:
+            if not row.is_read:
+                unread[row.user_id] = unread.get(row.user_id, 0) + 1
+        for user_id, count in unread.items():
+            db.query(User).filter(User.id == user_id).update(
+                {User.unread_notification_count: func.greatest(User.unread_notification_count - count, 0)},
+                synchronize_session=False,
+            )
+
+    def _release_unread_receipts(self, db: Session, rows):
+        # Deleted unread receipts of targeted broadcasts the read-all watermark didn't cover yet
+        unread = [(row.broadcast_id, row.user_id) for row in rows if row.read_at is None]
+        if not unread:
+            return
+        self._release_counts(
+            db,
+            select(User.id.label("user_id"), func.count().label("unread"))
+            .join(Broadcast, tuple_(Broadcast.id, User.id).in_(unread))
+            .where(or_(User.broadcasts_read_at.is_(None), Broadcast.created_at > User.broadcasts_read_at))
+            .group_by(User.id),
+        )
+
+    def _release_unread_broadcasts(self, db: Session, broadcast_ids: list):
+        # Clients an untargeted broadcast reached who neither read it nor read all after it
+        self._release_counts(
+            db,
+            select(User.id.label("user_id"), func.count().label("unread"))
+            .join(
+                Broadcast,
+                and_(
+                    Broadcast.id.in_(broadcast_ids),
+                    Broadcast.targeted == False,
+                    Broadcast.created_at >= User.created_at,
+                ),
+            )
+            .outerjoin(
+                BroadcastReceipt,
+                and_(BroadcastReceipt.broadcast_id == Broadcast.id, BroadcastReceipt.user_id == User.id),
+            )
+            .where(
+                User.role == "client",
+                BroadcastReceipt.user_id.is_(None),
+                or_(User.broadcasts_read_at.is_(None), Broadcast.created_at > User.broadcasts_read_at),
+            )
+            .group_by(User.id),
+        )
+
+    def _release_counts(self, db: Session, counts):
+        # counts selects (user_id, unread) pairs to take off the users' unread counters
+        counts = counts.subquery()
+        db.execute(
+            update(User)
+            .where(User.id == counts.c.user_id)
+            .values(unread_notification_count=func.greatest(User.unread_notification_count - counts.c.unread, 0))
+        )
+
+
+retention_service = RetentionService(
+    read_days=settings.NOTIFICATION_READ_RETENTION_DAYS,
+    max_per_user=settings.NOTIFICATION_MAX_PER_USER,
+    broadcast_days=settings.BROADCAST_RETENTION_DAYS,
+    push_days=settings.PUSH_RETENTION_DAYS,
+    device_days=settings.DEVICE_TOKEN_RETENTION_DAYS,
+    batch_size=settings.RETENTION_BATCH_SIZE,
+)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    retention_service.run()
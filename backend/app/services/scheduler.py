@@ -1,82 +1,291 @@
+"""Scheduled notification sender.
+
+Runs inside the API workers by default. With SCHEDULER_IN_API=False it runs on its own:
+
+    python -m app.services.scheduler
+
+However many copies run, only the holder of a Postgres advisory lock sends.
+"""
 import logging
-from datetime import datetime, date
+import signal
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import psycopg
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import SessionLocal
 from app.models.notification import ScheduledNotification
 from app.services.notification_service import notification_service
+from app.services.retention import retention_service
 
 logger = logging.getLogger(__name__)
 
+JOB_ID = "process_scheduled"
+RETENTION_JOB_ID = "notification_retention"
+# After an error the due rows are retried after this delay instead of immediately
+ERROR_RETRY_SECONDS = 60
+# Session advisory lock held by the leader for as long as its connection lives
+LEADER_LOCK_KEY = 715_020_001
+LEADER_RETRY_SECONDS = 10
+# How often the leader's listen loop checks for shutdown
+LISTEN_TIMEOUT_SECONDS = 1
+# Notified when a schedule is created, so the leader can wake up early
+CHANNEL = "scheduled_notifications"
+
+
+def parse_once_time(scheduled_time: str) -> datetime:
+    # Naive UTC; timestamps without an offset are taken as UTC
+    scheduled_dt = datetime.fromisoformat(scheduled_time)
+    if scheduled_dt.tzinfo is not None:
+        scheduled_dt = scheduled_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return scheduled_dt
+
+
+@lru_cache
+def _zone(tz: str) -> ZoneInfo:
+    # An unknown name on one user falls back to UTC instead of failing every schedule behind it
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {tz!r}, scheduling on UTC")
+        return ZoneInfo("UTC")
+
+
+def _local_run(scheduled_time: str, day: date, zone: ZoneInfo) -> datetime:
+    # "HH:MM" on `day` in `zone`, as naive UTC
+    hour, minute = map(int, scheduled_time.split(":"))
+    run_at = datetime.combine(day, time(hour, minute), tzinfo=zone)
+    return run_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def next_daily_run(scheduled_time: str, after: datetime, tz: str = "UTC") -> datetime:
+    # First "HH:MM" in `tz` strictly after `after`
+    zone = _zone(tz)
+    today = after.replace(tzinfo=timezone.utc).astimezone(zone).date()
+    run_at = _local_run(scheduled_time, today, zone)
+    if run_at <= after:
+        run_at = _local_run(scheduled_time, today + timedelta(days=1), zone)
+    return run_at
+
+
+def previous_daily_run(scheduled_time: str, at: datetime, tz: str = "UTC") -> datetime:
+    # Last "HH:MM" in `tz` at or before `at`
+    zone = _zone(tz)
+    today = at.replace(tzinfo=timezone.utc).astimezone(zone).date()
+    run_at = _local_run(scheduled_time, today, zone)
+    if run_at > at:
+        run_at = _local_run(scheduled_time, today - timedelta(days=1), zone)
+    return run_at
+
+
+def first_run_at(schedule_type: str, scheduled_time: str, now: datetime, timezones: list[str] | None = None) -> datetime:
+    # A daily schedule first runs for whichever of its recipients' timezones reaches HH:MM first
+    if schedule_type == "daily":
+        return min(next_daily_run(scheduled_time, now, tz) for tz in timezones or ["UTC"])
+    return parse_once_time(scheduled_time)
+
+
 class NotificationScheduler:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
+    # A single job that sleeps until the earliest next_run_at, capped at SCHEDULER_MAX_SLEEP_SECONDS.
+    # Every process may run one, but only the advisory-lock leader processes rows.
+
+    def __init__(self, dsn: str, max_sleep_seconds: float):
+        self.dsn = dsn
+        self.scheduler = BackgroundScheduler(timezone=timezone.utc)
+        self.max_sleep = timedelta(seconds=max_sleep_seconds)
         self.is_running = False
+        self.is_leader = False
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._leadership: threading.Thread | None = None
 
     def start(self):
         if not self.is_running:
             self.scheduler.add_job(
                 self.process_scheduled_notifications,
                 "interval",
-                minutes=1,
-                id="process_scheduled",
-                replace_existing=True
+                seconds=self.max_sleep.total_seconds(),
+                id=JOB_ID,
+                replace_existing=True,
+                coalesce=True,
+                max_instances=2,
+                misfire_grace_time=None,
             )
+            if settings.RETENTION_INTERVAL_HOURS > 0:
+                self.scheduler.add_job(
+                    self.run_retention,
+                    "interval",
+                    hours=settings.RETENTION_INTERVAL_HOURS,
+                    id=RETENTION_JOB_ID,
+                    replace_existing=True,
+                    coalesce=True,
+                )
 
             self.scheduler.start()
             self.is_running = True
+            self._stopping.clear()
+            self._leadership = threading.Thread(target=self._hold_leadership, name="scheduler-leader", daemon=True)
+            self._leadership.start()
             logger.info("Notification scheduler started.")
 
     def shutdown(self):
         if self.is_running:
+            self._stopping.set()
             self.scheduler.shutdown()
             self.is_running = False
+            if self._leadership:
+                self._leadership.join()
+                self._leadership = None
             logger.info("Notification scheduler shut down.")
 
+    def notify_schedule_changed(self, db: Session, run_at: datetime | None):
+        # Delivered to the leader when the caller commits, wherever the leader runs
+        if run_at is not None:
+            db.execute(text("SELECT pg_notify(:channel, :run_at)"), {"channel": CHANNEL, "run_at": run_at.isoformat()})
+
+    def wake(self, run_at: datetime | None):
+        if not self.is_running or run_at is None:
+            return
+        with self._lock:
+            job = self.scheduler.get_job(JOB_ID)
+            wake_at = max(run_at, datetime.utcnow()).replace(tzinfo=timezone.utc)
+            if job and (job.next_run_time is None or wake_at < job.next_run_time):
+                job.modify(next_run_time=wake_at)
+
+    def _hold_leadership(self):
+        # Leadership lasts as long as this connection holds the advisory lock; if the
+        # connection drops, Postgres releases the lock and another process takes over.
+        while not self._stopping.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    while not self._stopping.is_set():
+                        if conn.execute("SELECT pg_try_advisory_lock(%s)", (LEADER_LOCK_KEY,)).fetchone()[0]:
+                            break
+                        self._stopping.wait(LEADER_RETRY_SECONDS)
+                    else:
+                        return
+
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.is_leader = True
+                    logger.info("Acquired scheduler leadership.")
+                    self.wake(datetime.utcnow())
+                    while not self._stopping.is_set():
+                        for notify in conn.notifies(timeout=LISTEN_TIMEOUT_SECONDS):
+                            self.wake(datetime.fromisoformat(notify.payload))
+            except Exception as e:
+                logger.error(f"Scheduler leadership connection failed: {e}")
+            finally:
+                if self.is_leader:
+                    logger.info("Released scheduler leadership.")
+                self.is_leader = False
+            self._stopping.wait(LEADER_RETRY_SECONDS)
+
     def process_scheduled_notifications(self):
+        if not self.is_leader:
+            return
         db = SessionLocal()
+        next_run_at = None
         try:
-            now = datetime.utcnow()
-
-            active_items = db.query(ScheduledNotification).filter(
-                ScheduledNotification.is_active == True
-            ).all()
-
-            for item in active_items:
-                if item.schedule_type == "once":
-                    scheduled_dt = datetime.fromisoformat(item.scheduled_time)
-                    if scheduled_dt <= now:
-                        logger.info(f"Sending one-time notification: {item.title}")
-                        notification_service.send_bulk_push(db, item.title, item.content)
-                        item.is_active = False
-                        item.last_sent_at = now
-                        db.commit()
-
-                elif item.schedule_type == "daily":
-                    # scheduled_time is "HH:MM" format
-                    try:
-                        hour, minute = map(int, item.scheduled_time.split(":"))
-                    except (ValueError, AttributeError):
-                        logger.error(f"Invalid daily time format for notification {item.id}: {item.scheduled_time}")
-                        continue
-
-                    today = date.today()
-                    scheduled_today = datetime(today.year, today.month, today.day, hour, minute)
-
-                    if now >= scheduled_today:
-                        already_sent_today = (
-                            item.last_sent_at is not None
-                            and item.last_sent_at.date() == today
-                        )
-                        if not already_sent_today:
-                            logger.info(f"Sending daily notification: {item.title}")
-                            notification_service.send_bulk_push(db, item.title, item.content)
-                            item.last_sent_at = now
-                            db.commit()
-
+            while self._send_next_due(db):
+                pass
+            next_run_at = (
+                db.query(func.min(ScheduledNotification.next_run_at))
+                .filter(ScheduledNotification.is_active == True)
+                .scalar()
+            )
         except Exception as e:
+            db.rollback()
             logger.error(f"Error processing scheduled notifications: {e}")
+            next_run_at = datetime.utcnow() + timedelta(seconds=ERROR_RETRY_SECONDS)
         finally:
             db.close()
+        self._sleep_until(next_run_at)
+
+    def run_retention(self):
+        if not self.is_leader:
+            return
+        try:
+            retention_service.run()
+        except Exception as e:
+            logger.error(f"Error running notification retention: {e}")
+
+    def _send_next_due(self, db: Session) -> bool:
+        now = datetime.utcnow()
+        item = (
+            db.query(ScheduledNotification)
+            .filter(ScheduledNotification.is_active == True, ScheduledNotification.next_run_at <= now)
+            .order_by(ScheduledNotification.next_run_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if item is None:
+            return False
+
+        if item.dietitian_id is None:
+            # Schedules from before targeting go to every client at once, on UTC
+            logger.info(f"Sending {item.schedule_type} notification: {item.title}")
+            self._advance(item, now, ["UTC"])
+            notification_service.send_bulk_push(db, item.title, item.content)
+            return True
+
+        audience = notification_service.audience(item.dietitian_id, item.target_type, item.target_client_ids)
+        if item.schedule_type == "daily":
+            # One bucket per recipient timezone whose local HH:MM passed since the last run
+            timezones = notification_service.audience_timezones(db, audience)
+            since = item.last_sent_at or item.created_at
+            due = [tz for tz in timezones if previous_daily_run(item.scheduled_time, now, tz) > since]
+            audience = notification_service.audience(
+                item.dietitian_id, item.target_type, item.target_client_ids, timezones=due
+            )
+        else:
+            timezones = due = None
+        self._advance(item, now, timezones)
+        if due == []:
+            db.commit()
+            return True
+
+        logger.info(f"Sending {item.schedule_type} notification: {item.title}" + (f" to {', '.join(due)}" if due else ""))
+        # Sending commits, so the schedule advances in the same transaction as the notifications
+        notification_service.send_to_audience(db, audience, item.title, item.content)
+        return True
+
+    def _advance(self, item: ScheduledNotification, now: datetime, timezones: list[str] | None):
+        item.last_sent_at = now
+        if item.schedule_type == "daily":
+            item.next_run_at = first_run_at("daily", item.scheduled_time, now, timezones)
+        else:
+            item.is_active = False
+            item.next_run_at = None
+
+    def _sleep_until(self, next_run_at: datetime | None):
+        now = datetime.utcnow()
+        wake_at = now + self.max_sleep
+        if next_run_at is not None:
+            wake_at = min(max(next_run_at, now), wake_at)
+        with self._lock:
+            if self.is_running:
+                self.scheduler.modify_job(JOB_ID, next_run_time=wake_at.replace(tzinfo=timezone.utc))
+
+notification_scheduler = NotificationScheduler(
+    # psycopg takes a plain libpq URL, without the SQLAlchemy driver suffix
+    settings.DATABASE_URL.replace("postgresql+psycopg://", "postgresql://", 1),
+    settings.SCHEDULER_MAX_SLEEP_SECONDS,
+)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopped.set())
+    signal.signal(signal.SIGINT, lambda *args: stopped.set())
+    notification_scheduler.start()
+    stopped.wait()
+    notification_scheduler.shutdown()
+
 
-notification_scheduler = NotificationScheduler()
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import hmac
+import time
 from datetime import datetime, timedelta
 from uuid import UUID
 
@@ -5,31 +7,87 @@ import bcrypt
 from jose import JWTError, jwt
 
 from app.config import settings
+from app.utils.lru import ExpiringLRU
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def hash_password(password: str, rounds: int = settings.BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
-def create_access_token(user_id: UUID, role: str) -> str:
+def hash_rounds(hashed_password: str) -> int | None:
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def create_access_token(user_id: UUID, role: str, family_id: UUID | None = None) -> str:
+    # "fam" ties the token to its login session, so logging out cuts it off before it expires
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"sub": str(user_id), "role": role, "exp": expire, "type": "access"}
+    if family_id is not None:
+        to_encode["fam"] = str(family_id)
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-def create_refresh_token(user_id: UUID) -> str:
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"sub": str(user_id), "exp": expire, "type": "refresh"}
+def create_refresh_token(user_id: UUID, family_id: UUID, jti: UUID, expire: datetime) -> str:
+    to_encode = {"sub": str(user_id), "fam": str(family_id), "jti": str(jti), "exp": expire, "type": "refresh"}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-def decode_token(token: str) -> dict | None:
+def _jose_decode(token: str) -> dict | None:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
+
+
+def _pyjwt_decode(token: str) -> dict | None:
+    import jwt as pyjwt  # optional dependency, only needed with JWT_BACKEND=pyjwt
+
+    try:
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except pyjwt.PyJWTError:
+        return None
+
+
+# Verify signature and expiry, returning the claims or None
+JWT_DECODERS = {
+    "jose": _jose_decode,
+    "pyjwt": _pyjwt_decode,
+}
+
+_decode = JWT_DECODERS[settings.JWT_BACKEND]
+
+
+def decode_token(token: str) -> dict | None:
+    return _decode(token)
+
+
+# Verified access-token claims keyed by signature. The entry keeps the whole token and a hit
+# must match it exactly, so a reused signature on a different header or payload is not trusted.
+verified_tokens = ExpiringLRU(settings.TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> dict | None:
+    signature = token.rpartition(".")[2]
+    cached = verified_tokens.get(signature)
+    if cached is not None and hmac.compare_digest(cached[0], token):
+        payload = cached[1]
+        if payload["exp"] > time.time():
+            return payload
+        verified_tokens.pop(signature)
+        return None
+
+    payload = decode_token(token)
+    if payload is None or payload.get("type") != "access":
+        return None
+    if isinstance(payload.get("exp"), (int, float)):
+        # Cached no longer than the token is valid
+        verified_tokens.put(signature, (token, payload), payload["exp"] - time.time())
+    return payload
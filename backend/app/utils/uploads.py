@@ -0,0 +1,97 @@
+import mimetypes
+import os
+import re
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
+MESSAGE_UPLOADS_DIR = os.path.join(UPLOADS_DIR, "messages")
+MESSAGE_UPLOADS_URL = "/uploads/messages/"
+# Half-written files go here, outside the served tree but on the same filesystem, so the
+# final os.replace into UPLOADS_DIR stays atomic
+UPLOADS_TMP_DIR = os.path.join(os.path.dirname(UPLOADS_DIR), "uploads_tmp")
+# Temp files older than this were left by an interrupted upload
+STALE_TEMP_SECONDS = 3600
+
+# Derivatives are written next to the original as <stem>_<kind>.webp
+DERIVATIVE_SIZES = {"thumb": 256, "preview": 1024}
+DERIVATIVE_EXTENSION = "webp"
+# Formats Pillow can decode without extra plugins
+DERIVATIVE_SOURCE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+# Uploads are named by their SHA-256; derivatives add a _<kind> suffix
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64}(?:_[a-z]+)?)\.[a-z0-9]+$")
+
+
+def derivative_filename(filename: str, kind: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{kind}.{DERIVATIVE_EXTENSION}"
+
+
+def derivative_url(image_url: str | None, kind: str, ready: bool) -> str | None:
+    # ready is the recorded state of the derivative job; pending, failed and legacy uploads
+    # fall back to the original
+    if not ready or not image_url or not image_url.startswith(MESSAGE_UPLOADS_URL):
+        return image_url
+    return MESSAGE_UPLOADS_URL + derivative_filename(image_url[len(MESSAGE_UPLOADS_URL):], kind)
+
+
+def remove_stale_temp_files(max_age_seconds: float = STALE_TEMP_SECONDS) -> int:
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(UPLOADS_TMP_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# Upload names are never reused, so clients and CDNs may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class UploadsStaticFiles(StaticFiles):
+    # serve_mode "direct" streams files from this process (with Range support);
+    # "x-accel-redirect" (nginx) and "x-sendfile" (Apache/lighttpd) hand the bytes to the front proxy.
+
+    def __init__(self, *, directory: str, serve_mode: str = "direct", accel_prefix: str = "/internal-uploads/"):
+        super().__init__(directory=directory)
+        self.serve_mode = serve_mode
+        self.accel_prefix = accel_prefix.rstrip("/") + "/"
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {"cache-control": IMMUTABLE_CACHE_CONTROL}
+        # Content-addressed files already carry their hash in the name, which makes a strong ETag
+        match = CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+        if match:
+            headers["etag"] = f'"{match.group(1)}"'
+
+        if self.serve_mode == "direct":
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        else:
+            response = self._offload_response(str(full_path), headers)
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _offload_response(self, full_path: str, headers: dict[str, str]) -> Response:
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        if self.serve_mode == "x-sendfile":
+            headers["x-sendfile"] = os.path.abspath(full_path)
+        else:
+            relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            headers["x-accel-redirect"] = self.accel_prefix + relative_path
+        return Response(status_code=200, headers=headers, media_type=media_type)
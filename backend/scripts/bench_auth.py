@@ -0,0 +1,78 @@
+"""Per-request authentication overhead micro-benchmark.
+
+Times, in-process, what get_current_user spends on a token that a client keeps sending:
+verifying the JWT with each available decoder, the verified-token cache hit path, and the
+principal cache hit path. With --db it also times the users row lookup that every request
+used to make, against DATABASE_URL.
+
+    python scripts/bench_auth.py --iterations 20000 --db
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.principal_cache import Principal, principal_cache  # noqa: E402
+from app.utils import auth  # noqa: E402
+
+
+def bench(name: str, fn, iterations: int):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - started) / iterations
+    print(f"{name:<32} {per_call * 1e6:9.1f} us/call")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="also time the users row lookup")
+    args = parser.parse_args()
+
+    user_id = uuid.uuid4()
+    token = auth.create_access_token(user_id, "client")
+
+    results = {}
+    for backend, decode in auth.JWT_DECODERS.items():
+        try:
+            decode(token)
+        except ImportError:
+            print(f"{'decode (' + backend + ')':<32} not installed")
+            continue
+        results[backend] = bench(f"decode ({backend})", lambda: decode(token), args.iterations)
+
+    auth.decode_access_token(token)
+    cached = bench("decode_access_token (cached)", lambda: auth.decode_access_token(token), args.iterations)
+
+    principal_cache.put(Principal(user_id, "client", "Bench"))
+    principal = bench("principal cache hit", lambda: principal_cache.get(user_id), args.iterations)
+
+    lookup = 0.0
+    if args.db:
+        from app.database import SessionLocal
+        from app.models.user import User
+
+        db = SessionLocal()
+        try:
+            existing = db.query(User.id).limit(1).scalar() or user_id
+            lookup = bench(
+                "users row lookup",
+                lambda: (db.query(User).filter(User.id == existing).first(), db.rollback()),
+                max(args.iterations // 10, 1),
+            )
+        finally:
+            db.close()
+
+    before = results.get("jose", min(results.values(), default=0.0)) + lookup
+    after = cached + principal
+    print(f"\nper request: before {before * 1e6:.1f} us, after {after * 1e6:.1f} us (cache hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Login throughput benchmark.
+
+Fires concurrent logins at a running API for a fixed time and reports logins per second,
+per hashing core, and latency. A probe keeps requesting a cheap endpoint meanwhile, to show
+whether the rest of the API stays responsive during a login storm.
+
+    python scripts/bench_login.py --api http://localhost:8000/api --concurrency 64 --cores 2
+
+--cores is the number of processes hashing passwords on the server
+(API workers x PASSWORD_HASH_WORKERS). Benchmark users (bench-<n>@example.com) are
+registered on first use.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+PASSWORD = "bench-password"
+
+
+def _post(url: str, body: dict) -> int:
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def register_bench_user(api: str, index: int):
+    email = f"bench-{index}@example.com"
+    status = _post(f"{api}/auth/register", {"email": email, "password": PASSWORD, "full_name": f"Bench {index}"})
+    if status not in (201, 400):  # 400: already registered
+        raise RuntimeError(f"Registering {email} failed with {status}")
+
+
+def _quantiles(latencies: list[float]) -> str:
+    if len(latencies) < 2:
+        return "n/a"
+    q = statistics.quantiles(latencies, n=100)
+    return f"p50={q[49] * 1000:.0f}ms p95={q[94] * 1000:.0f}ms p99={q[98] * 1000:.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://localhost:8000/api")
+    parser.add_argument("--concurrency", type=int, default=32, help="logins in flight at once")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    parser.add_argument("--users", type=int, default=20, help="distinct bench users to log in as")
+    parser.add_argument("--cores", type=int, default=2, help="server processes hashing passwords")
+    args = parser.parse_args()
+
+    for index in range(args.users):
+        register_bench_user(args.api, index)
+
+    statuses: dict[int, int] = {}
+    latencies: list[float] = []
+    probe_latencies: list[float] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def login_loop(worker: int):
+        index = worker
+        while time.perf_counter() < deadline:
+            email = f"bench-{index % args.users}@example.com"
+            started = time.perf_counter()
+            status = _post(f"{args.api}/auth/login", {"email": email, "password": PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+            index += args.concurrency
+
+    def probe_loop():
+        root = args.api.rsplit("/api", 1)[0] + "/"
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            with urllib.request.urlopen(root) as response:
+                response.read()
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.concurrency)]
+    threads.append(threading.Thread(target=probe_loop))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ok = statuses.get(200, 0)
+    print(f"concurrency={args.concurrency} elapsed={elapsed:.1f}s statuses={dict(sorted(statuses.items()))}")
+    print(f"logins/s={ok / elapsed:.1f} per core={ok / elapsed / args.cores:.1f}")
+    print(f"login latency: {_quantiles(latencies)}")
+    print(f"probe latency: {_quantiles(probe_latencies)}")
+
+
+if __name__ == "__main__":
+    main()
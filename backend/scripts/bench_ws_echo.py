@@ -0,0 +1,124 @@
+"""Chat WebSocket echo latency benchmark.
+
+Opens many sockets against a running API, has every socket send messages to its own
+user and measures the time until the server echoes each one back. Prints p50/p95/p99.
+
+    python scripts/bench_ws_echo.py --api http://localhost:8000/api --sockets 1000
+
+Benchmark users (bench-<n>@example.com) are registered on first use.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+import websockets
+
+PASSWORD = "bench-password"
+
+
+def _post(url: str, body: dict) -> dict:
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def login_bench_user(api: str, index: int) -> str:
+    email = f"bench-{index}@example.com"
+    try:
+        _post(f"{api}/auth/register", {"email": email, "password": PASSWORD, "full_name": f"Bench {index}"})
+    except urllib.error.HTTPError as e:
+        if e.code != 400:  # already registered
+            raise
+    return _post(f"{api}/auth/login", {"email": email, "password": PASSWORD})["access_token"]
+
+
+def get_user_id(api: str, token: str) -> str:
+    request = urllib.request.Request(f"{api}/users/me", headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["id"]
+
+
+class Gate:
+    # Opens once `expected` sockets have connected
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.connected = 0
+        self.opened = asyncio.Event()
+
+    async def arrive(self):
+        self.connected += 1
+        if self.connected >= self.expected:
+            self.opened.set()
+        await self.opened.wait()
+
+
+async def run_socket(
+    ws_url: str, token: str, user_id: str, messages: int, interval: float, latencies: list, gate: Gate
+):
+    async with websockets.connect(f"{ws_url}/{token}", max_queue=None) as ws:
+        # Timing starts once every socket is open, so the connect storm isn't measured as echo latency
+        await gate.arrive()
+        # Spread sockets across the interval instead of firing them all at once
+        await asyncio.sleep(random.uniform(0, interval))
+        for seq in range(messages):
+            nonce = f"bench:{user_id}:{seq}:{time.perf_counter_ns()}"
+            started = time.perf_counter()
+            await ws.send(json.dumps({"receiver_id": user_id, "content": nonce}))
+            # Messages to yourself can arrive twice (echo + delivery); the first one counts
+            while True:
+                reply = json.loads(await ws.recv())
+                if reply.get("content") == nonce:
+                    latencies.append(time.perf_counter() - started)
+                    break
+            await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://localhost:8000/api")
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50, help="distinct bench users shared by the sockets")
+    parser.add_argument("--messages", type=int, default=10, help="messages sent per socket")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between messages on a socket")
+    args = parser.parse_args()
+
+    ws_url = args.api.replace("http", "ws", 1) + "/messages/ws"
+    users = []
+    for index in range(args.users):
+        token = login_bench_user(args.api, index)
+        users.append((token, get_user_id(args.api, token)))
+
+    latencies: list[float] = []
+    gate = Gate(args.sockets)
+    sockets = asyncio.gather(
+        *(
+            run_socket(ws_url, *users[i % len(users)], args.messages, args.interval, latencies, gate)
+            for i in range(args.sockets)
+        )
+    )
+    opened = asyncio.ensure_future(gate.opened.wait())
+    await asyncio.wait({opened, sockets}, return_when=asyncio.FIRST_COMPLETED)
+    if sockets.done():
+        sockets.result()  # a socket failed before all were open
+    started = time.perf_counter()
+    await sockets
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"sockets={args.sockets} messages={len(latencies)} elapsed={elapsed:.1f}s")
+    print(
+        f"p50={quantiles[49] * 1000:.1f}ms p95={quantiles[94] * 1000:.1f}ms "
+        f"p99={quantiles[98] * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
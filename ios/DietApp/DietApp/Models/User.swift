@@ -6,10 +6,11 @@ struct User: Codable, Identifiable {
     let fullName: String
     let phone: String?
     let role: String
+    let timezone: String?
     let createdAt: String
 
     enum CodingKeys: String, CodingKey {
-        case id, email, phone, role
+        case id, email, phone, role, timezone
         case fullName = "full_name"
         case createdAt = "created_at"
     }
@@ -20,6 +21,10 @@ struct LoginRequest: Codable {
     let password: String
 }
 
+struct UserUpdate: Codable {
+    let timezone: String
+}
+
 struct TokenResponse: Codable {
     let accessToken: String
     let refreshToken: String
@@ -36,6 +36,16 @@ actor APIClient {
         body: (any Encodable)? = nil,
         authenticated: Bool = true
     ) async throws -> T {
+        try await requestPage(path: path, method: method, body: body, authenticated: authenticated).value
+    }
+
+    // Paged endpoints return the cursor for the next page in the X-Next-Cursor header
+    func requestPage<T: Decodable>(
+        path: String,
+        method: String = "GET",
+        body: (any Encodable)? = nil,
+        authenticated: Bool = true
+    ) async throws -> (value: T, nextCursor: String?) {
         guard let url = URL(string: "\(baseURL)\(path)") else {
             throw APIError.invalidURL
         }
@@ -60,7 +70,7 @@ actor APIClient {
 
         if httpResponse.statusCode == 401 && authenticated {
             if try await refreshToken() {
-                return try await self.request(path: path, method: method, body: body, authenticated: true)
+                return try await self.requestPage(path: path, method: method, body: body, authenticated: true)
             }
             throw APIError.unauthorized
         }
@@ -73,7 +83,8 @@ actor APIClient {
         }
 
         do {
-            return try decoder.decode(T.self, from: data)
+            let value = try decoder.decode(T.self, from: data)
+            return (value, httpResponse.value(forHTTPHeaderField: "X-Next-Cursor"))
         } catch {
             throw APIError.decodingError
         }
@@ -13,7 +13,7 @@ enum AuthService {
         KeychainHelper.save(key: "refresh_token", value: token.refreshToken)
 
         let user: User = try await APIClient.shared.request(path: "/users/me")
-        return user
+        return await syncTimeZone(user)
     }
 
     static func logout() {
@@ -21,7 +21,20 @@ enum AuthService {
     }
 
     static func getCurrentUser() async throws -> User {
-        try await APIClient.shared.request(path: "/users/me")
+        let user: User = try await APIClient.shared.request(path: "/users/me")
+        return await syncTimeZone(user)
+    }
+
+    // Daily notifications are sent at the user's local time, so keep the server on the device's zone
+    private static func syncTimeZone(_ user: User) async -> User {
+        let identifier = TimeZone.current.identifier
+        guard user.timezone != identifier else { return user }
+        let updated: User? = try? await APIClient.shared.request(
+            path: "/users/me",
+            method: "PUT",
+            body: UserUpdate(timezone: identifier)
+        )
+        return updated ?? user
     }
 
     static var isLoggedIn: Bool {
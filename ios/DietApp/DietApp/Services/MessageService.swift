@@ -9,12 +9,25 @@ struct UploadResponse: Decodable {
 }
 
 enum MessageService {
+    static let pageSize = 50
+
     static func getConversations() async throws -> [Conversation] {
         try await APIClient.shared.request(path: "/messages/conversations")
     }
 
-    static func getMessages(with userId: UUID) async throws -> [Message] {
-        try await APIClient.shared.request(path: "/messages/\(userId.uuidString)")
+    // Returns the latest page, or the page before `before`, oldest first, with the cursor for older messages
+    static func getMessages(with userId: UUID, before: String? = nil) async throws -> (messages: [Message], nextCursor: String?) {
+        var path = "/messages/\(userId.uuidString)?limit=\(pageSize)"
+        if let before {
+            path += "&before=\(before.addingPercentEncoding(withAllowedCharacters: .urlQueryAllowed) ?? before)"
+        }
+        let page: (value: [Message], nextCursor: String?) = try await APIClient.shared.requestPage(path: path)
+        return (page.value, page.nextCursor)
+    }
+
+
+    static func markRead(with userId: UUID) async throws {
+        try await APIClient.shared.requestVoid(path: "/messages/\(userId.uuidString)/read", method: "POST")
     }
 
     static func sendMessage(to receiverId: UUID, content: String?, imageUrl: String?) async throws -> Message {
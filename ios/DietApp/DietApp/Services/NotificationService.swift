@@ -33,6 +33,12 @@ class NotificationService {
         }
     }
 
+    // Personal notifications and broadcasts, from the counter the server keeps per user
+    func getUnreadCount() async throws -> Int {
+        let response: [String: Int] = try await APIClient.shared.request(path: "/notifications/unread-count")
+        return response["count"] ?? 0
+    }
+
     // MARK: - Polling
 
     func startPolling() {
@@ -67,7 +73,7 @@ class NotificationService {
             }
 
             seenIds = seen
-            await updateBadge(count: unread.count)
+            await updateBadge(count: try await getUnreadCount())
         } catch {
             // silently fail
         }
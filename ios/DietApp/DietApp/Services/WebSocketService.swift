@@ -42,6 +42,10 @@ final class WebSocketService {
                 switch message {
                 case .string(let text):
                     if let data = text.data(using: .utf8),
+                       let frame = try? JSONDecoder().decode([String: String].self, from: data),
+                       frame["type"] == "ping" {
+                        self?.webSocketTask?.send(.string("{\"type\":\"pong\"}")) { _ in }
+                    } else if let data = text.data(using: .utf8),
                        let msg = try? JSONDecoder().decode(Message.self, from: data) {
                         Task { @MainActor in
                             self?.onMessageReceived?(msg)
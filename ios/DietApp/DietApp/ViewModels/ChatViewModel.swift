@@ -16,15 +16,25 @@ final class ChatViewModel {
     var showCamera = false
     var capturedImage: UIImage?
     var isSending = false
+    var isLoadingOlder = false
 
     private let webSocket = WebSocketService()
+    private var chatUserId: UUID?
+    // Cursor for the page before the oldest loaded message; nil once the history is exhausted
+    private var olderCursor: String?
 
     init() {
         webSocket.onMessageReceived = { [weak self] message in
-            self?.messages.append(message)
+            self?.receive(message)
         }
     }
 
+    // The server echoes our own sends over the socket as well, so a message may arrive twice
+    func receive(_ message: Message) {
+        guard !messages.contains(where: { $0.id == message.id }) else { return }
+        messages.append(message)
+    }
+
     func loadConversations() async {
         isLoading = true
         do {
@@ -39,14 +49,32 @@ final class ChatViewModel {
 
     func loadMessages(with userId: UUID) async {
         isLoading = true
+        chatUserId = userId
         do {
-            messages = try await MessageService.getMessages(with: userId)
+            let page = try await MessageService.getMessages(with: userId)
+            messages = page.messages
+            olderCursor = page.nextCursor
+            try? await MessageService.markRead(with: userId)
         } catch {
             errorMessage = "Mesajlar yüklenemedi"
         }
         isLoading = false
     }
 
+    func loadOlderMessages() async {
+        guard let chatUserId, let cursor = olderCursor, !isLoadingOlder else { return }
+        isLoadingOlder = true
+        do {
+            let page = try await MessageService.getMessages(with: chatUserId, before: cursor)
+            let loaded = Set(messages.map(\.id))
+            messages.insert(contentsOf: page.messages.filter { !loaded.contains($0.id) }, at: 0)
+            olderCursor = page.nextCursor
+        } catch {
+            errorMessage = "Mesajlar yüklenemedi"
+        }
+        isLoadingOlder = false
+    }
+
     func sendMessage(to receiverId: UUID) async {
         let content = messageText.trimmingCharacters(in: .whitespacesAndNewlines)
 
@@ -79,7 +107,7 @@ final class ChatViewModel {
                 content: content.isEmpty ? nil : content,
                 imageUrl: imageUrl
             )
-            messages.append(msg)
+            receive(msg)
             clearSelectedImage()
         } catch {
             errorMessage = "Mesaj gönderilemedi"
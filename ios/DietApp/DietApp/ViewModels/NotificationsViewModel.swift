@@ -5,17 +5,17 @@ final class NotificationsViewModel {
     var notifications: [AppNotification] = []
     var isLoading = false
     var errorMessage: String?
-
-    var unreadCount: Int {
-        notifications.filter { !$0.isRead }.count
-    }
+    var unreadCount = 0
 
     func loadNotifications() async {
         isLoading = true
         errorMessage = nil
 
         do {
-            notifications = try await APIClient.shared.request(path: "/notifications")
+            async let feed: [AppNotification] = APIClient.shared.request(path: "/notifications")
+            async let count = NotificationService.shared.getUnreadCount()
+            notifications = try await feed
+            unreadCount = try await count
         } catch let error as APIError {
             errorMessage = error.errorDescription
         } catch {
@@ -28,6 +28,7 @@ final class NotificationsViewModel {
     func markAllAsRead() async {
         do {
             try await APIClient.shared.requestVoid(path: "/notifications/read-all", method: "POST")
+            unreadCount = 0
             for i in notifications.indices {
                 let n = notifications[i]
                 if !n.isRead {
@@ -47,6 +48,9 @@ final class NotificationsViewModel {
             try await APIClient.shared.requestVoid(path: "/notifications/\(id)/read", method: "POST")
             if let index = notifications.firstIndex(where: { $0.id == id }) {
                 let n = notifications[index]
+                if !n.isRead {
+                    unreadCount = max(unreadCount - 1, 0)
+                }
                 notifications[index] = AppNotification(
                     id: n.id, userId: n.userId, title: n.title,
                     content: n.content, isRead: true, createdAt: n.createdAt
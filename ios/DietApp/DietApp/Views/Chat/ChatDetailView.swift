@@ -330,11 +330,18 @@ struct MessagesList: View {
                             baseURL: baseURL
                         )
                         .id(message.id)
+                        .onAppear {
+                            // Reaching the oldest loaded message pulls in the page before it
+                            if message.id == viewModel.messages.first?.id {
+                                Task { await viewModel.loadOlderMessages() }
+                            }
+                        }
                     }
                 }
                 .padding()
             }
-            .onChange(of: viewModel.messages.count) {
+            // Follows new messages only; older pages are prepended without jumping to the bottom
+            .onChange(of: viewModel.messages.last?.id) {
                 if let last = viewModel.messages.last {
                     withAnimation {
                         proxy.scrollTo(last.id, anchor: .bottom)
@@ -0,0 +1,37 @@
+import XCTest
+@testable import DietApp
+
+final class ChatViewModelTests: XCTestCase {
+    private func makeMessage(id: UUID = UUID()) -> Message {
+        Message(
+            id: id,
+            senderId: UUID(),
+            receiverId: UUID(),
+            content: "Merhaba",
+            imageUrl: nil,
+            isRead: false,
+            createdAt: "2026-10-18T10:00:00"
+        )
+    }
+
+    func testSocketEchoOfSentMessageIsNotAppendedTwice() {
+        let viewModel = ChatViewModel()
+        let message = makeMessage()
+
+        viewModel.receive(message)  // REST response
+        viewModel.receive(message)  // WebSocket echo of the same message
+
+        XCTAssertEqual(viewModel.messages.map(\.id), [message.id])
+    }
+
+    func testDistinctMessagesAreAppendedInOrder() {
+        let viewModel = ChatViewModel()
+        let first = makeMessage()
+        let second = makeMessage()
+
+        viewModel.receive(first)
+        viewModel.receive(second)
+
+        XCTAssertEqual(viewModel.messages.map(\.id), [first.id, second.id])
+    }
+}
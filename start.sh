@@ -5,6 +5,9 @@ trap 'kill 0; exit' SIGINT SIGTERM
 echo "Backend baslatiliyor..."
 cd backend && source venv/bin/activate && uvicorn app.main:app --reload &
 
+echo "Push worker baslatiliyor..."
+cd backend && source venv/bin/activate && python -m app.services.push_worker &
+
 echo "Admin panel baslatiliyor..."
 cd admin && npm run dev &
 